@@ -1,28 +1,59 @@
 # backend/api.py
 
+import asyncio
+import json
 import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
 from datetime import timedelta, datetime
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from jose import JWTError, jwt
 
 # Import our custom modules
+import auto_matcher
+import bulk_import
 import db
-import face_utils
+import duplicates
+import identity_cache
+import inference
+import jobs
+import notification_bus
+import orphan_photos
+import photo_store
+import thumbnails
+import video_search
 
 # --- Configuration & Setup ---
 SECRET_KEY = "a_very_secret_key_that_you_should_definitely_change"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Increased for easier development
-PHOTOS_DIR = "photos"
+PHOTOS_DIR = photo_store.PHOTOS_DIR
+IMPORTS_DIR = "imports"
+BASE_URL = "http://localhost:8000"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_TOP_K = 100
+MAX_TOP_K = 1000
+# Open notification streams re-send the unread count this often; it doubles as
+# the keep-alive and picks up notifications created by other API processes.
+NOTIFICATION_REFRESH_SECONDS = 25
+# How long a notification stream ticket stays redeemable after it is issued
+STREAM_TICKET_SECONDS = 30
 
 # Ensure the photos directory exists on startup
 os.makedirs(PHOTOS_DIR, exist_ok=True)
+os.makedirs(thumbnails.THUMBNAILS_DIR, exist_ok=True)
 
 # OAuth2 scheme points to the login endpoint
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/login")
@@ -42,7 +73,88 @@ app.add_middleware(
 
 # --- Static File Serving ---
 # This makes images in the 'photos' folder accessible via a URL
-app.mount("/photos", StaticFiles(directory=PHOTOS_DIR), name="photos")
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that sends a Cache-Control header. ETag/Last-Modified still
+    answer conditional requests with 304 once a cached copy goes stale.
+    """
+
+    def __init__(self, *args, cache_control: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.cache_control
+        return response
+
+# Photos are named by their content hash and never change, so browsers may keep them
+# for a year without revalidating. Thumbnails keep their URL when regenerated
+# (generate_thumbnails.py --force), so they are only cached for a day.
+app.mount("/photos", CachedStaticFiles(directory=PHOTOS_DIR, cache_control="public, max-age=31536000, immutable"), name="photos")
+app.mount("/thumbnails", CachedStaticFiles(directory=thumbnails.THUMBNAILS_DIR, cache_control="public, max-age=86400"), name="thumbnails")
+
+# --- Startup ---
+# Heavy setup runs in the background so light endpoints like /api/login are
+# served immediately; /api/ready reports when search is fully available.
+# Load every case embedding into memory once, so searches never scan the table.
+@app.on_event("startup")
+def load_search_index():
+    def load():
+        db.ensure_person_index()
+        print(f"Search index loaded with {len(db.person_index)} active cases.")
+        db.ensure_found_index()
+        # With several API processes, each one's index also needs the others' changes
+        while db.INDEX_SYNC_SECONDS > 0:
+            time.sleep(db.INDEX_SYNC_SECONDS)
+            try:
+                db.sync_indexes()
+            except Exception as e:
+                print(f"Search index sync failed: {e}")
+    threading.Thread(target=load, name="search-index-loader", daemon=True).start()
+
+# Face inference runs in separate worker processes so it never blocks the event loop.
+@app.on_event("startup")
+def start_inference_pool():
+    inference.start()
+
+# Case registrations and bulk imports are processed by background workers (see jobs.py).
+@app.on_event("startup")
+async def start_job_workers():
+    registration_jobs.start()
+    bulk_import_jobs.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await registration_jobs.stop()
+    await bulk_import_jobs.stop()
+
+# Stored photos that no case or pending registration uses any more are removed periodically.
+_background_tasks: set = set()
+
+@app.on_event("startup")
+async def start_orphan_photo_sweep():
+    async def sweep_forever():
+        while True:
+            await asyncio.sleep(orphan_photos.ORPHAN_SWEEP_SECONDS)
+            try:
+                removed = await run_in_threadpool(orphan_photos.sweep, pending_registration_photos)
+                if removed:
+                    print(f"Removed {removed} photos no case refers to.")
+            except Exception as e:
+                print(f"Orphan photo sweep failed: {e}")
+    if orphan_photos.ORPHAN_SWEEP_SECONDS > 0:
+        task = asyncio.get_running_loop().create_task(sweep_forever())
+        _background_tasks.add(task)
+
+@app.on_event("shutdown")
+def save_search_index():
+    db.save_person_index()
+    db.save_found_index()
+
+@app.on_event("shutdown")
+def stop_inference_pool():
+    inference.shutdown()
 
 # --- Pydantic Models (Data Validation) ---
 class Token(BaseModel):
@@ -54,6 +166,12 @@ class UserCreate(BaseModel):
     username: str
     password: str
 
+class CaseIds(BaseModel):
+    ids: list[int]
+
+class NotificationIds(BaseModel):
+    ids: list[int] | None = None  # None marks every notification
+
 # --- JWT & Authentication Dependencies ---
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -75,10 +193,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         role: str = payload.get("role")
+        token_user_id: int | None = payload.get("uid")
         if username is None or role is None:
             raise credentials_exception
-        user_id = db.get_user_id(username)
+        # Hot path: the token's user id matches the cached identity, no DB round trip.
+        user_id = identity_cache.get(username)
         if user_id is None:
+            user_id = db.get_user_id(username)
+            if user_id is None:
+                raise credentials_exception
+            identity_cache.put(username, user_id)
+        # Tokens issued before the 'uid' claim existed carry no id to compare.
+        if token_user_id is not None and token_user_id != user_id:
             raise credentials_exception
         return {"id": user_id, "username": username, "role": role}
     except JWTError:
@@ -89,8 +215,67 @@ async def get_current_admin_user(current_user: dict = Depends(get_current_user))
         raise HTTPException(status_code=403, detail="Admin access required.")
     return current_user
 
+# --- Listing Helpers ---
+URL_FIELDS = ("photo_url", "thumbnail_url", "thumbnail_jpeg_url")
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    """Turns ?fields=name,photo_url into the DB columns to select (photo and thumbnail URLs need photo_path)."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return list(dict.fromkeys("photo_path" if name in URL_FIELDS else name for name in names))
+
+def add_photo_urls(rows: list[dict], fields: str | None = None) -> list[dict]:
+    """
+    Adds photo_url plus thumbnail_url (WebP) and thumbnail_jpeg_url to each row,
+    honouring an explicit ?fields= selection.
+    """
+    requested = {name.strip() for name in fields.split(",")} if fields else None
+    for row in rows:
+        photo_path = row.get('photo_path')
+        if requested is not None and "photo_path" not in requested:
+            row.pop('photo_path', None)
+        if not photo_path or not isinstance(photo_path, str):
+            continue
+        urls = {
+            "photo_url": f"{BASE_URL}/photos/{photo_store.url_path(photo_path)}",
+            "thumbnail_url": f"{BASE_URL}/thumbnails/{thumbnails.thumbnail_name(photo_path, 'webp')}",
+            "thumbnail_jpeg_url": f"{BASE_URL}/thumbnails/{thumbnails.thumbnail_name(photo_path, 'jpg')}",
+        }
+        row.update((name, url) for name, url in urls.items() if requested is None or name in requested)
+    return rows
+
+def paginate(rows: list[dict], limit: int) -> tuple[list[dict], int | None]:
+    """Rows are fetched with limit + 1; the extra row only signals that another page exists."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]['id']
+    return rows, None
+
+def save_upload(upload: UploadFile, path: str | None = None) -> str:
+    """
+    Copies an upload to `path` (or a named temporary file) and returns where it
+    went; blocking, so run it in the threadpool.
+    """
+    if path is not None:
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload.file, f, 1024 * 1024)
+        return path
+    suffix = os.path.splitext(upload.filename or "")[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(upload.file, f, 1024 * 1024)
+        return f.name
+
 # --- API Endpoints ---
 
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 200 once the search index and face models are loaded, 503 before."""
+    status = {"search_index": db.person_index.loaded, "face_models": inference.is_ready()}
+    if not all(status.values()):
+        raise HTTPException(status_code=503, detail=status)
+    return {"ready": True, **status}
+
 @app.post("/api/register")
 async def register_user(user: UserCreate):
     """Endpoint for regular users to create a new account."""
@@ -112,13 +297,46 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         raise HTTPException(status_code=404, detail="User role not found.")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    identity_cache.put(form_data.username, user_id)
     access_token = create_access_token(
-        data={"sub": form_data.username, "role": user_role},
+        data={"sub": form_data.username, "uid": user_id, "role": user_role},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer", "role": user_role}
 
-@app.post("/api/person/register")
+# --- Background Registration Jobs ---
+async def process_registration(job: dict) -> dict:
+    """Embeds a stored upload and inserts the case; runs on a registration_jobs worker."""
+    photo_path = job["photo_path"]
+    # Photos are stored by content hash: a re-submitted photo reuses its embedding
+    embedding = await run_in_threadpool(db.get_embedding_by_photo, photo_path)
+    image_bytes = None
+    if embedding is None:
+        image_bytes = await run_in_threadpool(photo_store.read, photo_path)
+        embedding = await inference.get_embedding(image_bytes)  # ValueError (no face) fails the job
+    await run_in_threadpool(thumbnails.generate_quietly, photo_path, image_bytes)
+
+    # Checked before inserting, so the new case can't match itself
+    possible_duplicates = await run_in_threadpool(duplicates.possible_duplicates, embedding)
+    person_data = {key: job[key] for key in ("name", "age", "gender", "loc", "photo_path")}
+    person_id = await run_in_threadpool(db.add_person, person_data, embedding, job["user_id"])
+    if person_id is None:
+        raise ConnectionError("Database unavailable")  # Retried
+    auto_matcher.schedule(person_id, embedding, job["name"])
+    return {
+        "person_id": person_id,
+        "filename": photo_store.url_path(photo_path),
+        "possible_duplicates": possible_duplicates,
+    }
+
+# Uploads of failed or rejected registrations are left for the orphan sweep
+registration_jobs = jobs.JobQueue("registration", process_registration)
+
+def pending_registration_photos() -> set:
+    """Photos of registrations still queued or running in any process; blocks on the database."""
+    return {job.payload["photo_path"] for job in registration_jobs.pending()}
+
+@app.post("/api/person/register", status_code=202)
 async def register_person(
     photo: UploadFile = File(...),
     name: str = Form(...),
@@ -127,140 +345,354 @@ async def register_person(
     loc: str = Form(...),
     current_user: dict = Depends(get_current_user)
 ):
-    """Endpoint for logged-in users to register a new missing person case."""
+    """
+    Endpoint for logged-in users to register a new missing person case. The
+    photo is stored and the rest happens in the background: responds 202 with
+    a job id to poll at /api/jobs/{job_id}.
+    """
+    image_bytes = await photo.read()
+    photo_path, _ = await run_in_threadpool(photo_store.save, image_bytes, photo.filename or "")
+    job = {
+        "photo_path": photo_path, "user_id": current_user['id'],
+        "name": name, "age": age, "gender": gender, "loc": loc,
+    }
+    # The same user re-submitting the same case (e.g. a client retry) gets the existing job back
+    key = f"{current_user['id']}:{photo_path}:{name}:{age}:{gender}:{loc}"
     try:
-        image_bytes = await photo.read()
-        embedding = face_utils.get_embedding(image_bytes)
-        
-        file_extension = os.path.splitext(photo.filename)[1]
-        photo_filename = f"{uuid.uuid4()}{file_extension}"
-        photo_path = os.path.join(PHOTOS_DIR, photo_filename)
-        
-        with open(photo_path, "wb") as f:
-            f.write(image_bytes)
-            
-        person_data = {"name": name, "age": age, "gender": gender, "loc": loc, "photo_path": photo_path}
-        db.add_person(person_data, embedding, current_user['id'])
-        
-        return {"message": "Person registered successfully", "filename": photo_filename}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+        submitted = await registration_jobs.submit(job, current_user['id'], key=key)
+    except (jobs.QueueFullError, ConnectionError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return JSONResponse(status_code=202, content={
+        "message": "Registration accepted and is being processed.",
+        "job_id": submitted.id,
+        "status": submitted.status,
+        "status_url": f"/api/jobs/{submitted.id}",
+    })
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status of a background job: queued, running, succeeded (with its result) or failed (with the error)."""
+    job = await registration_jobs.get(job_id) or await bulk_import_jobs.get(job_id)
+    if job is None or (job.owner_id != current_user['id'] and current_user.get('role') != 'admin'):
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
 
 @app.post("/api/person/search")
 async def search_by_photo(
     photo: UploadFile = File(...),
     strictness: float = Form(0.4),
+    nprobe: int | None = Form(None),  # Search depth: higher = better recall, slower
+    exact: bool = Form(False),        # Skip the approximate index, e.g. to verify results
+    top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),  # Return at most this many best matches
     admin: dict = Depends(get_current_admin_user) # Secured for admins only
 ):
     """Admin-only endpoint to search for a person by photo."""
     try:
         query_bytes = await photo.read()
-        q_emb = face_utils.get_embedding(query_bytes)
-        matches = db.find_matches(q_emb, strictness)
-        base_url = "http://localhost:8000"
-        for match in matches:
-            photo_path = match.get('photo_path')
-            if photo_path and isinstance(photo_path, str):
-                clean_path = photo_path.replace('\\', '/').lstrip('photos/')
-                match['photo_url'] = f"{base_url}/photos/{clean_path}"
-        return {"matches": matches}
+        q_emb = await inference.get_embedding(query_bytes)
+        # In the threadpool: during startup find_matches waits for the index to finish loading
+        matches = await run_in_threadpool(db.find_matches, q_emb, strictness, nprobe=nprobe, exact=exact, top_k=top_k)
+        return {"matches": add_photo_urls(matches)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except inference.InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
+
+@app.post("/api/person/search/faces")
+async def search_by_group_photo(
+    photo: UploadFile = File(...),
+    strictness: float = Form(0.4),
+    nprobe: int | None = Form(None),
+    exact: bool = Form(False),
+    top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),  # Per face
+    admin: dict = Depends(get_current_admin_user)
+):
+    """
+    Admin-only search with every face in the photo (group or crowd shots).
+    Returns one entry per detected face with its bounding box and its matches.
+    """
+    try:
+        query_bytes = await photo.read()
+        faces = await inference.get_faces(query_bytes)
+        matches = await run_in_threadpool(
+            db.find_matches_many, [face["embedding"] for face in faces], strictness, nprobe=nprobe, exact=exact, top_k=top_k
+        )
+        return {"faces": [
+            {"bbox": face["bbox"], "det_score": face["det_score"], "matches": add_photo_urls(face_matches)}
+            for face, face_matches in zip(faces, matches)
+        ]}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except inference.InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
 
+@app.post("/api/person/search/stream")
+async def search_by_photo_stream(
+    photo: UploadFile = File(...),
+    strictness: float = Form(0.4),
+    nprobe: int | None = Form(None),
+    exact: bool = Form(False),
+    top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),
+    admin: dict = Depends(get_current_admin_user)
+):
+    """
+    Admin-only streaming variant of /api/person/search. Responds with NDJSON:
+    one {"event": "candidates", ...} line each time a chunk of the index yields
+    new top matches, then a final {"event": "done", "matches": [...]} ranking.
+    """
+    try:
+        query_bytes = await photo.read()
+        q_emb = await inference.get_embedding(query_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except inference.InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+    def events():
+        try:
+            for event in db.stream_matches(q_emb, strictness, nprobe=nprobe, exact=exact, top_k=top_k):
+                event["matches"] = add_photo_urls(event["matches"])
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": f"An internal error occurred: {e}"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+# --- Background Bulk Imports ---
+async def process_bulk_import(job: dict) -> dict:
+    """Runs (or resumes) an uploaded import; runs on a bulk_import_jobs worker. The result is its report."""
+    summary = await run_in_threadpool(
+        bulk_import.import_cases, job["manifest_path"], job["archive_path"], job["user_id"], job["report_path"]
+    )  # ValueError (bad manifest or archive) fails the job
+    report = await run_in_threadpool(bulk_import.read_report, job["report_path"])
+    failures = [entry for entry in report.values() if entry["status"] != "ok"]
+    return {"import_id": job["import_id"], **summary, "failures": failures}
+
+# One import at a time per process: each already keeps the whole inference pool busy
+bulk_import_jobs = jobs.JobQueue("bulk_import", process_bulk_import, workers=1)
+
+@app.post("/api/person/bulk-import", status_code=202)
+async def bulk_import_cases(
+    manifest: UploadFile | None = File(None),
+    archive: UploadFile | None = File(None),
+    import_id: str | None = Form(None),
+    admin: dict = Depends(get_current_admin_user)
+):
+    """
+    Admin-only endpoint to import many cases at once from a CSV manifest and a
+    ZIP of photos. The files are stored and the import runs in the background:
+    responds 202 with a job id to poll at /api/jobs/{job_id}, whose result is
+    the import report. Pass back the returned import_id (without files) to
+    resume an interrupted import; rows already imported are skipped.
+    """
+    if import_id is None:
+        if manifest is None or archive is None:
+            raise HTTPException(status_code=400, detail="A manifest and a photo archive are required.")
+        import_id = uuid.uuid4().hex
+    elif not import_id.isalnum():
+        raise HTTPException(status_code=400, detail="Invalid import id.")
+    import_dir = os.path.join(IMPORTS_DIR, import_id)
+    job = {
+        "import_id": import_id,
+        "manifest_path": os.path.join(import_dir, "manifest.csv"),
+        "archive_path": os.path.join(import_dir, "photos.zip"),
+        "report_path": os.path.join(import_dir, "report.csv"),
+        "user_id": admin['id'],
+    }
+
+    # Two runs of one import would both import the rows its report hasn't marked done yet
+    running = next((other for other in await run_in_threadpool(bulk_import_jobs.pending)
+                    if other.payload["import_id"] == import_id), None)
+    if running is None:
+        if manifest is not None and archive is not None:
+            await run_in_threadpool(os.makedirs, import_dir, exist_ok=True)
+            await run_in_threadpool(save_upload, manifest, job["manifest_path"])
+            await run_in_threadpool(save_upload, archive, job["archive_path"])
+        elif not os.path.exists(job["manifest_path"]):
+            raise HTTPException(status_code=404, detail="Import not found.")
+        try:
+            running = await bulk_import_jobs.submit(job, admin['id'])
+        except (jobs.QueueFullError, ConnectionError) as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return JSONResponse(status_code=202, content={
+        "message": "Import accepted and is being processed.",
+        "import_id": import_id,
+        "job_id": running.id,
+        "status": running.status,
+        "status_url": f"/api/jobs/{running.id}",
+    })
+
 @app.get("/api/person/my-cases")
-async def get_my_cases(current_user: dict = Depends(get_current_user)):
-    """Endpoint for a regular user to see their own submitted cases."""
+async def get_my_cases(
+    cursor: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Endpoint for a regular user to see their own submitted cases, one page at a time."""
     try:
-        cases = db.get_user_cases(current_user['id'])
-        base_url = "http://localhost:8000"
-        for case in cases:
-            photo_path = case.get('photo_path')
-            if photo_path and isinstance(photo_path, str):
-                clean_path = photo_path.replace('\\', '/').lstrip('photos/')
-                case['photo_url'] = f"{base_url}/photos/{clean_path}"
-        return {"cases": cases}
+        cases = db.get_user_cases(current_user['id'], before_id=cursor, limit=limit + 1, fields=parse_fields(fields))
+        cases, next_cursor = paginate(cases, limit)
+        return {"cases": add_photo_urls(cases, fields), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve cases: {e}")
 
+FOUND_NOTIFICATION = "Update: Your registered case for '{name}' has been marked as found by an administrator."
+MAX_BULK_MARK_FOUND = 1000
+
 @app.post("/api/person/{person_id}/mark-found")
 async def mark_case_as_found(person_id: int, admin: dict = Depends(get_current_admin_user)):
-    """Admin-only endpoint to mark a case as found."""
-    success = db.mark_person_as_found(person_id)
-    if not success:
+    """Admin-only endpoint to mark a case as found; the case's creator is notified."""
+    try:
+        moved = await run_in_threadpool(db.mark_person_as_found, person_id, FOUND_NOTIFICATION)
+    except Exception as e:
+        print(f"ERROR in mark_case_as_found: {e}")
+        raise HTTPException(status_code=500, detail="An internal server error occurred while marking case as found.")
+    if moved is None:
         raise HTTPException(status_code=404, detail="Person not found in active cases.")
-    return {"message": "Case marked as found successfully."}
+    return {"message": "Case marked as found and user notified."}
+
+@app.post("/api/person/mark-found")
+async def mark_cases_as_found(body: CaseIds, admin: dict = Depends(get_current_admin_user)):
+    """
+    Admin-only bulk version of mark-found, e.g. to close every case resolved in
+    an operation. All cases move and their creators' notifications are queued
+    in one transaction. Ids that are not active cases are listed as not_found.
+    """
+    if len(body.ids) > MAX_BULK_MARK_FOUND:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_MARK_FOUND} cases per request.")
+    try:
+        moved = await run_in_threadpool(db.mark_persons_as_found, body.ids, FOUND_NOTIFICATION)
+    except Exception as e:
+        print(f"ERROR in mark_cases_as_found: {e}")
+        raise HTTPException(status_code=500, detail="An internal server error occurred while marking cases as found.")
+    found_ids = {case['id'] for case in moved}
+    return {
+        "message": f"{len(found_ids)} case(s) marked as found.",
+        "found": sorted(found_ids),
+        "not_found": sorted(set(body.ids) - found_ids),
+    }
 
 @app.get("/api/person/found-cases")
-async def get_all_found_cases(admin: dict = Depends(get_current_admin_user)):
-    """Admin-only endpoint to view all resolved/found cases."""
+async def get_all_found_cases(
+    cursor: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    admin: dict = Depends(get_current_admin_user)
+):
+    """Admin-only endpoint to view resolved/found cases, one page at a time."""
     try:
-        cases = db.get_found_cases()
-        base_url = "http://localhost:8000"
-        for case in cases:
-            photo_path = case.get('photo_path')
-            if photo_path and isinstance(photo_path, str):
-                clean_path = photo_path.replace('\\', '/').lstrip('photos/')
-                case['photo_url'] = f"{base_url}/photos/{clean_path}"
-        return {"cases": cases}
+        cases = db.get_found_cases(before_id=cursor, limit=limit + 1, fields=parse_fields(fields))
+        cases, next_cursor = paginate(cases, limit)
+        return {"cases": add_photo_urls(cases, fields), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve found cases: {e}")
     
 
 
 @app.get("/api/person/all-active-cases")
-async def get_all_cases(admin: dict = Depends(get_current_admin_user)):
-    """Admin-only endpoint to view all active cases from all users."""
+async def get_all_cases(
+    cursor: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    admin: dict = Depends(get_current_admin_user)
+):
+    """Admin-only endpoint to view active cases from all users, one page at a time."""
     try:
-        cases = db.get_all_active_cases()
-        base_url = "http://localhost:8000"
-        for case in cases:
-            photo_path = case.get('photo_path')
-            if photo_path and isinstance(photo_path, str):
-                clean_path = photo_path.replace('\\', '/').lstrip('photos/')
-                case['photo_url'] = f"{base_url}/photos/{clean_path}"
-        return {"cases": cases}
+        cases = db.get_all_active_cases(before_id=cursor, limit=limit + 1, fields=parse_fields(fields))
+        cases, next_cursor = paginate(cases, limit)
+        return {"cases": add_photo_urls(cases, fields), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve all cases: {e}")
     
 
 
-@app.post("/api/person/{person_id}/mark-found")
-async def mark_case_as_found(person_id: int, admin: dict = Depends(get_current_admin_user)):
-    try:
-        # --- Notification Logic ---
-        # Get the case details *before* moving/deleting it.
-        case_creator_id = db.get_case_creator(person_id)
-        case_name = db.get_case_name(person_id)
-
-        # --- Database Action ---
-        success = db.mark_person_as_found(person_id)
-        
-        if not success:
-            raise HTTPException(status_code=404, detail="Person not found in active cases.")
-        
-        # --- Create Notification on Success ---
-        # This part will now run correctly.
-        if case_creator_id and case_name:
-            message = f"Update: Your registered case for '{case_name}' has been marked as found by an administrator."
-            db.create_notification(case_creator_id, message)
-        
-        return {"message": "Case marked as found and user notified."}
-
-    except Exception as e:
-        # This will catch any unexpected errors and report them properly
-        print(f"ERROR in mark_case_as_found: {e}")
-        raise HTTPException(status_code=500, detail="An internal server error occurred while marking case as found.")
 # ADD these THREE NEW endpoints to api.py
 
 @app.get("/api/notifications")
-async def get_notifications(current_user: dict = Depends(get_current_user)):
-    """Fetches all notifications for the logged-in user."""
-    notifications = db.get_unread_notifications(current_user['id'])
-    return {"notifications": notifications}
+async def get_notifications(
+    cursor: int | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    unread_only: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Fetches the logged-in user's notifications, newest first, one page at a time."""
+    notifications = db.get_unread_notifications(current_user['id'], before_id=cursor, limit=limit + 1, unread_only=unread_only)
+    notifications, next_cursor = paginate(notifications, limit)
+    return {"notifications": notifications, "next_cursor": next_cursor}
+
+@app.get("/api/notifications/unread-count")
+async def get_unread_count(current_user: dict = Depends(get_current_user)):
+    """Number of unread notifications, without fetching any of them."""
+    return {"count": db.count_unread_notifications(current_user['id'])}
+
+def publish_unread_count(user_id: int) -> None:
+    """Tells the user's open streams (e.g. other tabs) the new unread count."""
+    notification_bus.publish(user_id, {"event": "unread_count", "count": db.count_unread_notifications(user_id)})
+
+@app.post("/api/notifications/stream-ticket")
+async def create_notification_stream_ticket(current_user: dict = Depends(get_current_user)):
+    """
+    Issues a short-lived, single-use ticket for /api/notifications/stream.
+    EventSource can't send headers, so the stream is opened with this ticket
+    in its URL rather than the access token, which would end up in logs.
+    """
+    ticket = await run_in_threadpool(db.create_stream_ticket, current_user['id'], STREAM_TICKET_SECONDS)
+    if ticket is None:
+        raise HTTPException(status_code=503, detail="Could not issue a stream ticket.")
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_SECONDS}
+
+@app.get("/api/notifications/stream")
+async def notification_stream(request: Request, ticket: str = Query(...)):
+    """
+    Server-Sent Events stream of the user's notifications, opened with a ticket
+    from /api/notifications/stream-ticket. Each message is JSON:
+    {"event": "unread_count", "count": n} on connect and periodically,
+    {"event": "notification", "notification": {...}} whenever one is created,
+    with the same fields and values as /api/notifications returns.
+    """
+    user_id = await run_in_threadpool(db.redeem_stream_ticket, ticket)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+
+    async def events():
+        _, queue = subscription = notification_bus.subscribe(user_id)
+        try:
+            count = await run_in_threadpool(db.count_unread_notifications, user_id)
+            yield f"data: {json.dumps({'event': 'unread_count', 'count': count})}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), NOTIFICATION_REFRESH_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    count = await run_in_threadpool(db.count_unread_notifications, user_id)
+                    event = {"event": "unread_count", "count": count}
+                yield f"data: {json.dumps(jsonable_encoder(event))}\n\n"
+        finally:
+            notification_bus.unsubscribe(user_id, subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Stop reverse proxies from buffering the stream
+    })
+
+@app.post("/api/notifications/read")
+async def mark_many_as_read(body: NotificationIds, current_user: dict = Depends(get_current_user)):
+    """Marks the given notifications as read, or all of them when no ids are given."""
+    updated = db.mark_notifications_as_read(current_user['id'], body.ids)
+    await run_in_threadpool(publish_unread_count, current_user['id'])
+    return {"message": f"{updated} notification(s) marked as read.", "updated": updated}
 
 @app.post("/api/notifications/{notification_id}/read")
 async def mark_as_read(notification_id: int, current_user: dict = Depends(get_current_user)):
@@ -268,4 +700,48 @@ async def mark_as_read(notification_id: int, current_user: dict = Depends(get_cu
     success = db.mark_notification_as_read(notification_id, current_user['id'])
     if not success:
         raise HTTPException(status_code=404, detail="Notification not found or access denied.")
-    return {"message": "Notification marked as read."}
\ No newline at end of file
+    await run_in_threadpool(publish_unread_count, current_user['id'])
+    return {"message": "Notification marked as read."}
+
+@app.post("/api/admin/video-search")
+async def search_video(
+    video: UploadFile = File(...),
+    sample_fps: float = Form(video_search.VIDEO_SAMPLE_FPS, gt=0, le=30),  # Frames analysed per second of footage
+    strictness: float = Form(0.4),
+    top_k: int = Form(10, ge=1, le=MAX_TOP_K),  # Per tracked face
+    admin: dict = Depends(get_current_admin_user)
+):
+    """
+    Admin-only search through video footage. Faces are tracked across sampled
+    frames and each tracked person is searched once; returns the tracks that
+    matched a case, with the time ranges they were on screen.
+    """
+    video_path = await run_in_threadpool(save_upload, video)
+    try:
+        result = await inference.extract_video_tracks(video_path, sample_fps, timeout=video_search.VIDEO_TIMEOUT)
+        result = await run_in_threadpool(video_search.attach_matches, result, strictness, top_k)
+        for track in result["tracks"]:
+            track["matches"] = add_photo_urls(track["matches"])
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except inference.InferenceTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
+    finally:
+        os.remove(video_path)
+
+@app.get("/api/admin/stats")
+async def get_stats(admin: dict = Depends(get_current_admin_user)):
+    """Admin-only endpoint exposing runtime counters for monitoring."""
+    return {
+        "db_pool": db.pool_stats(),
+        "identity_cache": identity_cache.stats(),
+        "search_index": db.index_stats(),
+        "embedding_cache": inference.cache_stats(),
+        "auto_matcher": auto_matcher.stats(),
+        "registration_jobs": await run_in_threadpool(registration_jobs.queue_stats),
+        "bulk_import_jobs": await run_in_threadpool(bulk_import_jobs.queue_stats),
+        "notification_streams": notification_bus.stats(),
+    }
@@ -0,0 +1,85 @@
+# backend/auto_matcher.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+import db
+
+# --- Auto-matching Configuration ---
+# A new case scoring at least this against a found person or another open case
+# triggers an alert to every admin. Stricter than a manual search on purpose:
+# these alerts arrive unasked, so they should rarely be wrong.
+AUTO_MATCH_THRESHOLD = float(os.environ.get("AUTO_MATCH_THRESHOLD", 0.55))
+# At most this many hits of each kind are listed in one alert.
+AUTO_MATCH_MAX_HITS = 3
+
+# One background thread: matching a case is a couple of index lookups, and
+# running them in order keeps alert volume predictable under bulk imports.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auto-matcher")
+_stats = {"scheduled": 0, "matched": 0, "alerts": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def _format_hits(hits: List[tuple]) -> str:
+    return ", ".join(f"#{person_id} ({similarity:.0%})" for person_id, similarity in hits)
+
+
+def match_case(person_id: int, embedding: np.ndarray, name: str = "") -> int:
+    """
+    Scores one newly registered case against the found-persons archive and the
+    other open cases, and notifies every admin if it closely matches any of
+    them. Returns the number of notifications sent.
+    """
+    db.ensure_person_index()
+    db.ensure_found_index()
+    found_hits = db.found_index.search(embedding, AUTO_MATCH_THRESHOLD, top_k=AUTO_MATCH_MAX_HITS)
+    open_hits = [
+        hit for hit in db.person_index.search(embedding, AUTO_MATCH_THRESHOLD, top_k=AUTO_MATCH_MAX_HITS + 1)
+        if hit[0] != person_id
+    ][:AUTO_MATCH_MAX_HITS]
+    if not found_hits and not open_hits:
+        return 0
+
+    parts = []
+    if found_hits:
+        parts.append(f"already-found case {_format_hits(found_hits)}")
+    if open_hits:
+        parts.append(f"open case {_format_hits(open_hits)}")
+    # notifications.message is VARCHAR(255)
+    message = f"Auto-match: new case #{person_id} '{name[:40]}' resembles {' and '.join(parts)}."[:255]
+    admin_ids = db.get_admin_ids()
+    for admin_id in admin_ids:
+        db.create_notification(admin_id, message)
+    _count("matched")
+    _count("alerts", len(admin_ids))
+    return len(admin_ids)
+
+
+def _run(person_id: int, embedding: np.ndarray, name: str) -> None:
+    try:
+        match_case(person_id, embedding, name)
+    except Exception as e:
+        _count("errors")
+        print(f"Auto-matching failed for case #{person_id}: {e}")
+
+
+def schedule(person_id: int | None, embedding: np.ndarray, name: str = "") -> None:
+    """Queues a new case for matching in the background; registration never waits for it."""
+    if person_id is None:
+        return
+    _count("scheduled")
+    _executor.submit(_run, person_id, np.asarray(embedding, dtype=np.float32), name or "")
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
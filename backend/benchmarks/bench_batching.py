@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_batching.py
+"""
+Compares the one-image-per-job inference path with micro-batching under
+concurrent load.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_batching path/to/photos --concurrency 32 --rounds 3
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+import inference
+
+
+def load_images(folder: str) -> list[bytes]:
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+            with open(os.path.join(folder, name), "rb") as f:
+                images.append(f.read())
+    if not images:
+        raise SystemExit(f"No images found in {folder}")
+    return images
+
+
+async def timed(coro) -> float:
+    started = time.perf_counter()
+    try:
+        await coro
+    except ValueError:
+        pass  # Photos without a face still count towards throughput
+    return time.perf_counter() - started
+
+
+async def run_mode(images: list[bytes], concurrency: int, rounds: int, batched: bool) -> dict:
+    jobs = [images[i % len(images)] for i in range(concurrency)]
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        if batched:
+            batcher = inference.get_batcher()
+            coros = [batcher.submit(img) for img in jobs]
+        else:
+            coros = [inference.run(inference._get_embedding, img) for img in jobs]
+        latencies += await asyncio.gather(*(timed(c) for c in coros))
+    elapsed = time.perf_counter() - started
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "images_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 1),
+    }
+
+
+async def main(args) -> None:
+    images = load_images(args.folder)
+    inference.start(args.workers)
+    # Warm every worker up so model loading is not part of the measurement
+    await asyncio.gather(*(inference.run(inference._get_embedding, images[0]) for _ in range(args.workers)), return_exceptions=True)
+
+    single = await run_mode(images, args.concurrency, args.rounds, batched=False)
+    batched = await run_mode(images, args.concurrency, args.rounds, batched=True)
+    print(f"{'path':<10}{'images/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, result in (("single", single), ("batched", batched)):
+        print(f"{name:<10}{result['images_per_s']:>12}{result['p50_ms']:>10}{result['p95_ms']:>10}")
+    print("batcher:", inference.get_batcher().stats())
+    inference.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="Folder of face photos to replay")
+    parser.add_argument("--concurrency", type=int, default=32, help="Simultaneous requests per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=inference.INFERENCE_WORKERS)
+    asyncio.run(main(parser.parse_args()))
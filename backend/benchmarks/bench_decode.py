@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_decode.py
+"""
+Compares the original image pre-processing (full PIL decode + RGB convert)
+with face_utils.load_image (JPEG draft decoding, EXIF orientation, bounded
+resize): decode latency, peak memory and, with --embed, end-to-end
+get_embedding latency.
+
+Each path runs in a fresh process, so peak RSS figures don't contaminate
+each other.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_decode path/to/photos [--embed]
+    python -m benchmarks.bench_decode --synthetic 4000x3000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+
+def legacy_load(img_bytes: bytes) -> np.ndarray:
+    """The pre-processing get_embedding used before load_image existed."""
+    return np.array(Image.open(BytesIO(img_bytes)).convert("RGB"))
+
+
+def fast_load(img_bytes: bytes) -> np.ndarray:
+    from face_utils import load_image
+    return load_image(img_bytes)
+
+
+def synthetic_jpeg(size: str) -> bytes:
+    width, height = (int(v) for v in size.split("x"))
+    rng = np.random.default_rng(0)
+    # Smooth gradients plus noise compress like a real photo rather than pure noise
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = (gradient + rng.normal(0, 20, (height, width, 3))).clip(0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def measure(mode: str, images: list[bytes], embed: bool, results) -> None:
+    load = legacy_load if mode == "legacy" else fast_load
+    if embed:
+        import face_utils
+        face_utils.warm_up()
+        rec_model = face_utils.get_app()
+
+        def run(img_bytes):
+            faces = rec_model.get(load(img_bytes))
+            return faces[0].embedding if faces else None
+    else:
+        run = load
+    run(images[0])  # Warm caches and lazy imports
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for img_bytes in images:
+        started = time.perf_counter()
+        run(img_bytes)
+        timings.append(time.perf_counter() - started)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((mode, 1000 * float(np.mean(timings)), 1000 * float(np.percentile(timings, 95)), (peak_kb - baseline_kb) / 1024))
+
+
+def main(args) -> None:
+    if args.synthetic:
+        images = [synthetic_jpeg(args.synthetic)] * 10
+    else:
+        images = []
+        for name in sorted(os.listdir(args.folder)):
+            if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+                with open(os.path.join(args.folder, name), "rb") as f:
+                    images.append(f.read())
+    if not images:
+        raise SystemExit("No images to benchmark.")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    print(f"{len(images)} images, {'get_embedding' if args.embed else 'decode only'}")
+    print(f"{'path':<8}{'mean ms':>10}{'p95 ms':>10}{'peak +MB':>10}")
+    for mode in ("legacy", "fast"):
+        process = ctx.Process(target=measure, args=(mode, images, args.embed, results))
+        process.start()
+        process.join()
+        name, mean_ms, p95_ms, peak_mb = results.get()
+        print(f"{name:<8}{mean_ms:>10.1f}{p95_ms:>10.1f}{peak_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", nargs="?", help="Folder of photos to decode")
+    parser.add_argument("--synthetic", metavar="WxH", help="Use a generated JPEG of this size instead of a folder")
+    parser.add_argument("--embed", action="store_true", help="Time full get_embedding, not just decoding (needs the models)")
+    args = parser.parse_args()
+    if not args.folder and not args.synthetic:
+        parser.error("give a folder or --synthetic WxH")
+    main(args)
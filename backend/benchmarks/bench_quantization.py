@@ -0,0 +1,67 @@
+# backend/benchmarks/bench_quantization.py
+"""
+Measures memory, search latency and recall of the compact index encodings
+against the float32 index, on synthetic clustered face embeddings.
+
+Recall@k compares the two-stage result (compact scan of top_k * RERANK_FACTOR
+candidates, then exact re-ranking) with an exact float32 search.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_quantization --cases 100000 --queries 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from embedding_codec import ENCODINGS
+from search_index import EmbeddingIndex
+
+
+def synthetic_embeddings(n: int, identities: int, rng: np.random.Generator) -> np.ndarray:
+    """Clusters of noisy vectors around random identity centres, like several photos per person."""
+    centres = rng.standard_normal((identities, 512)).astype(np.float32)
+    labels = rng.integers(0, identities, n)
+    return centres[labels] + 0.8 * rng.standard_normal((n, 512)).astype(np.float32)
+
+
+def main(args) -> None:
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_embeddings(args.cases, max(1, args.cases // 5), rng)
+    ids = list(range(args.cases))
+    queries = vectors[rng.integers(0, args.cases, args.queries)] + 0.5 * rng.standard_normal((args.queries, 512)).astype(np.float32)
+    full = EmbeddingIndex._normalize(vectors)
+
+    exact = EmbeddingIndex()
+    exact.build(ids, vectors)
+    truth = [{pid for pid, _ in exact.search(q, -1.0, nprobe=0, top_k=args.top_k)} for q in queries]
+
+    print(f"{args.cases} cases, {args.queries} queries, recall@{args.top_k}, re-rank factor {args.rerank_factor}")
+    print(f"{'encoding':<10}{'memory MB':>12}{'saved':>8}{'ms/query':>10}{'recall':>8}")
+    baseline_bytes = exact.memory_bytes
+    for encoding in ENCODINGS:
+        index = EmbeddingIndex(encoding=encoding)
+        index.build(ids, vectors)
+        found = 0
+        started = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            k = args.top_k if encoding == "float32" else args.top_k * args.rerank_factor
+            candidates = np.array([pid for pid, _ in index.search(q, -1.0, nprobe=0, top_k=k)])
+            scores = full[candidates] @ EmbeddingIndex._normalize(q)
+            result = EmbeddingIndex._ranked(candidates, scores, args.top_k)
+            found += len(expected & {pid for pid, _ in result})
+        per_query_ms = 1000 * (time.perf_counter() - started) / args.queries
+        recall = found / (args.top_k * args.queries)
+        saved = 1 - index.memory_bytes / baseline_bytes
+        print(f"{encoding:<10}{index.memory_bytes / 2**20:>12.1f}{saved:>8.0%}{per_query_ms:>10.2f}{recall:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,524 @@
+# backend/benchmarks/run_suite.py
+"""
+Benchmark suite for the search and registration hot paths, run against a
+synthetic case table at growing scales (1k, 10k, 100k and 1M cases by default).
+
+At each scale it measures:
+  populate       bulk-insert throughput of synthetic cases
+  index          rebuild-from-table and load-from-file time, traced peak memory
+  find_matches   latency percentiles (approximate, exact, and grouped via find_matches_many)
+  get_embedding  latency percentiles of the face model
+  search_api     POST /api/person/search through the full FastAPI stack
+  registration   POST /api/person/register until every background job is done
+  peak_rss_mb    process peak resident memory so far
+
+Everything runs in a scratch directory on the embedded SQLite backend, so no
+MySQL server is touched. With --model stub (the default) face inference is
+replaced by a lookup of each generated photo's synthetic embedding, so the
+numbers are database and index costs alone; --model real runs buffalo_l in
+the inference pool and needs a --photos folder of real face photos.
+
+Results are written as JSON; --compare prints the change between two runs.
+The 1M scale needs several GB of memory and disk; pick scales with --scales.
+
+Usage (from the backend folder):
+    python -m benchmarks.run_suite --scales 1000,10000,100000 --output before.json
+    python -m benchmarks.run_suite --model real --photos path/to/faces --scales 10000
+    python -m benchmarks.run_suite --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCALES = "1000,10000,100000,1000000"
+# Synthetic rows come in groups of this many noisy photos of one identity.
+PHOTOS_PER_PERSON = 5
+EMBEDDING_NOISE = 0.8
+POPULATE_CHUNK = 5000
+# --compare flags a metric that got this much worse.
+REGRESSION_TOLERANCE = 0.10
+
+
+# ==============================================================================
+# SECTION: Synthetic data
+# ==============================================================================
+
+def identity_centres(identities: np.ndarray, seed: int) -> np.ndarray:
+    """One random centre per identity, derived from (seed, identity) so any slice is reproducible."""
+    return np.stack([
+        np.random.default_rng((seed, int(identity))).standard_normal(512, dtype=np.float32)
+        for identity in identities
+    ])
+
+
+def case_embeddings(start: int, stop: int, seed: int) -> np.ndarray:
+    """Embeddings for rows start..stop of the synthetic table, like bench_quantization's clusters."""
+    identities, inverse = np.unique(np.arange(start, stop) // PHOTOS_PER_PERSON, return_inverse=True)
+    noise = np.random.default_rng((seed, 1, start)).standard_normal((stop - start, 512), dtype=np.float32)
+    return identity_centres(identities, seed)[inverse] + EMBEDDING_NOISE * noise
+
+
+def query_embeddings(cases: int, count: int, seed: int, salt: int) -> np.ndarray:
+    """New photos of people already in the table, so searches have true matches to find."""
+    rng = np.random.default_rng((seed, 2, salt))
+    identities = rng.integers(0, max(1, cases // PHOTOS_PER_PERSON), count)
+    noise = rng.standard_normal((count, 512), dtype=np.float32)
+    return identity_centres(identities, seed) + EMBEDDING_NOISE * noise
+
+
+def fake_face_photo(seed: int, size: tuple[int, int] = (320, 400)) -> bytes:
+    """A small JPEG of a drawn face. Bytes differ per seed, so photos never deduplicate by accident."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    image = Image.new("RGB", size, tuple(int(v) for v in rng.integers(0, 256, 3)))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((width * 0.2, height * 0.15, width * 0.8, height * 0.85), fill=tuple(int(v) for v in rng.integers(120, 240, 3)))
+    for x in (0.38, 0.62):
+        draw.ellipse((width * x - 10, height * 0.4 - 6, width * x + 10, height * 0.4 + 6), fill=(40, 40, 40))
+    draw.arc((width * 0.38, height * 0.55, width * 0.62, height * 0.7), 20, 160, fill=(120, 40, 40), width=4)
+    pixels = np.asarray(image, dtype=np.int16) + rng.integers(-12, 13, (height, width, 3))
+    buffer = BytesIO()
+    Image.fromarray(pixels.clip(0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def load_photos(folder: str) -> list[bytes]:
+    photos = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
+            with open(os.path.join(folder, name), "rb") as f:
+                photos.append(f.read())
+    if not photos:
+        raise SystemExit(f"No photos found in {folder}")
+    return photos
+
+
+# ==============================================================================
+# SECTION: Face models
+# ==============================================================================
+
+class StubFaceModel:
+    """
+    Stands in for buffalo_l: every generated photo "contains" the embedding it
+    was generated for, and anything else has no face. Installed over
+    inference.get_embedding/get_faces, so the API's code paths are unchanged.
+    """
+
+    def __init__(self):
+        self._embeddings = {}
+
+    def photo(self, seed: int, embedding: np.ndarray) -> bytes:
+        image_bytes = fake_face_photo(seed)
+        self._embeddings[self._key(image_bytes)] = np.asarray(embedding, dtype=np.float32)
+        return image_bytes
+
+    @staticmethod
+    def _key(image_bytes: bytes) -> str:
+        import photo_store
+        return photo_store.content_hash(image_bytes)
+
+    def _embed(self, image_bytes: bytes) -> np.ndarray:
+        embedding = self._embeddings.get(self._key(image_bytes))
+        if embedding is None:
+            raise ValueError("No face detected in the image.")
+        return embedding
+
+    async def get_embedding(self, image_bytes: bytes, timeout: float | None = None) -> np.ndarray:
+        return self._embed(image_bytes)
+
+    async def get_faces(self, image_bytes: bytes, timeout: float | None = None) -> list[dict]:
+        return [{"bbox": [0, 0, 1, 1], "det_score": 1.0, "embedding": self._embed(image_bytes)}]
+
+    def install(self) -> None:
+        import inference
+        inference.get_embedding = self.get_embedding
+        inference.get_faces = self.get_faces
+
+
+class PhotoSource:
+    """Hands out query and registration photos from the stub model or a folder of real faces."""
+
+    def __init__(self, stub: StubFaceModel | None, folder_photos: list[bytes] | None, seed: int):
+        self.stub = stub
+        self.folder_photos = folder_photos
+        self.seed = seed
+        self._next_seed = 0
+
+    def take(self, cases: int, count: int) -> list[bytes]:
+        if self.stub is None:
+            return [self.folder_photos[i % len(self.folder_photos)] for i in range(count)]
+        embeddings = query_embeddings(cases, count, self.seed, salt=self._next_seed)
+        photos = [self.stub.photo(self._next_seed + i, embedding) for i, embedding in enumerate(embeddings)]
+        self._next_seed += count
+        return photos
+
+
+# ==============================================================================
+# SECTION: Measurements
+# ==============================================================================
+
+def latency_stats(seconds: list[float]) -> dict:
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def timed(func, *args, **kwargs) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def populate(db, current: int, target: int, seed: int, owner_id: int) -> dict:
+    """Grows the synthetic table from `current` to `target` rows with add_persons_bulk."""
+    insert_seconds = 0.0
+    for start in range(current, target, POPULATE_CHUNK):
+        stop = min(start + POPULATE_CHUNK, target)
+        embeddings = case_embeddings(start, stop, seed)
+        records = [
+            {"name": f"Case {row}", "age": 5 + row % 80, "gender": ("Male", "Female")[row % 2],
+             "loc": "Benchmark", "photo_path": os.path.join("photos", "bench", f"{row}.jpg")}
+            for row in range(start, stop)
+        ]
+        elapsed, _ = timed(db.add_persons_bulk, records, list(embeddings), owner_id)
+        insert_seconds += elapsed
+    rows = target - current
+    return {"rows": rows, "seconds": round(insert_seconds, 3), "rows_per_s": round(rows / insert_seconds, 1) if rows else None}
+
+
+def measure_index(db, search_index) -> dict:
+    """Startup cost of the person index: rebuilt from the table, then loaded from its file."""
+    def rebuild():
+        if os.path.exists(search_index.PERSON_INDEX_PATH):
+            os.remove(search_index.PERSON_INDEX_PATH)
+        return db.load_person_index()
+
+    rebuild_seconds, _ = timed(rebuild)
+    load_seconds, _ = timed(db.load_person_index)
+    # Separate pass, since tracing slows the Python parts of the rebuild down
+    tracemalloc.start()
+    rebuild()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    index = db.person_index
+    return {
+        "cases": len(index),
+        "trained": index.is_trained,
+        "encoding": index.encoding,
+        "memory_mb": round(index.memory_bytes / 2**20, 1),
+        "rebuild_seconds": round(rebuild_seconds, 3),
+        "load_from_file_seconds": round(load_seconds, 3),
+        "rebuild_peak_traced_mb": round(peak / 2**20, 1),
+    }
+
+
+def measure_find_matches(db, cases: int, args, salt: int) -> dict:
+    queries = query_embeddings(cases, args.queries, args.seed, salt)
+    for q in queries[:5]:
+        db.find_matches(q, args.strictness, top_k=args.top_k)  # Warm up
+
+    approximate, found = [], 0
+    for q in queries:
+        elapsed, matches = timed(db.find_matches, q, args.strictness, top_k=args.top_k)
+        approximate.append(elapsed)
+        found += len(matches)
+    exact = [timed(db.find_matches, q, args.strictness, exact=True, top_k=args.top_k)[0] for q in queries[:args.exact_queries]]
+    groups = [list(queries[i:i + args.group_size]) for i in range(0, len(queries) - args.group_size + 1, args.group_size)]
+    grouped = [timed(db.find_matches_many, group, args.strictness, top_k=args.top_k)[0] for group in groups]
+
+    tracemalloc.start()
+    for q in queries[:20]:
+        db.find_matches(q, args.strictness, top_k=args.top_k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "approximate": dict(latency_stats(approximate), mean_matches=round(found / len(queries), 2)),
+        "exact": latency_stats(exact),
+        "many": dict(latency_stats(grouped), faces_per_call=args.group_size),
+        "peak_traced_mb": round(peak / 2**20, 2),
+    }
+
+
+async def measure_get_embedding(inference, photos: list[bytes]) -> dict:
+    timings = []
+    for image_bytes in photos:
+        started = time.perf_counter()
+        try:
+            await inference.get_embedding(image_bytes)
+        except ValueError:
+            pass  # Photos without a face still cost a full inference
+        timings.append(time.perf_counter() - started)
+    return latency_stats(timings)
+
+
+async def measure_search_api(client, headers: dict, photos: list[bytes], args) -> dict:
+    timings, errors = [], 0
+    for image_bytes in photos:
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/person/search",
+            files={"photo": ("query.jpg", image_bytes, "image/jpeg")},
+            data={"strictness": str(args.strictness), "top_k": str(args.top_k)},
+            headers=headers,
+        )
+        timings.append(time.perf_counter() - started)
+        errors += response.status_code != 200
+    return dict(latency_stats(timings), errors=errors)
+
+
+async def measure_registration(client, headers: dict, api, photos: list[bytes], args) -> dict:
+    """Submits registrations `concurrency` at a time and waits for every background job to finish."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    submit_timings, job_ids, rejected = [], [], 0
+
+    async def register(i: int, image_bytes: bytes) -> None:
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/person/register",
+                files={"photo": (f"case{i}.jpg", image_bytes, "image/jpeg")},
+                data={"name": f"Registered {i}", "age": "30", "gender": "Female", "loc": "Benchmark"},
+                headers=headers,
+            )
+            submit_timings.append(time.perf_counter() - started)
+            if response.status_code == 202:
+                job_ids.append(response.json()["job_id"])
+            else:
+                rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(register(i, image_bytes) for i, image_bytes in enumerate(photos)))
+    while True:
+        registered = [await api.registration_jobs.get(job_id) for job_id in job_ids]
+        if all(job.done for job in registered):
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    succeeded = sum(job.status == "succeeded" for job in registered)
+    return {
+        "jobs": len(photos),
+        "succeeded": succeeded,
+        "failed": len(registered) - succeeded,
+        "rejected": rejected,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "jobs_per_s": round(succeeded / elapsed, 2),
+        "submit": latency_stats(submit_timings),
+        "job": latency_stats([job.updated_at - job.created_at for job in registered]),
+    }
+
+
+# ==============================================================================
+# SECTION: Runner
+# ==============================================================================
+
+def prepare_workdir(workdir: str) -> None:
+    """Points the storage backend, index files, photos and thumbnails at the scratch directory."""
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(workdir, "benchmark.db")
+    os.environ["PERSON_INDEX_PATH"] = os.path.join(workdir, "index", "persons.npz")
+    os.environ["FOUND_INDEX_PATH"] = os.path.join(workdir, "index", "found_persons.npz")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)  # photo_store and thumbnails write below the working directory
+
+
+def describe_environment(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "storage_backend": "sqlite",
+        "model": args.model,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("compare", "output", "workdir", "keep")},
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    import api
+    import db
+    import inference
+    import search_index
+
+    stub = None
+    folder_photos = None
+    if args.model == "stub":
+        stub = StubFaceModel()
+        stub.install()
+    else:
+        folder_photos = load_photos(args.photos)
+        inference.start()
+        while not inference.is_ready():
+            await asyncio.sleep(0.5)
+    photos = PhotoSource(stub, folder_photos, args.seed)
+
+    db.create_user("bench-admin", "!", "admin")  # Never logs in; its token is issued directly
+    admin_id = db.get_user_id("bench-admin")
+    token = api.create_access_token({"sub": "bench-admin", "uid": admin_id, "role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    report = {"suite": "run_suite", "meta": describe_environment(args), "results": []}
+    synthetic_rows = 0
+    # No lifespan events: the API's startup hooks would start a real inference pool
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for salt, scale in enumerate(args.scales):
+            print(f"--- {scale:,} cases ---")
+            result = {"cases": scale}
+            result["populate"] = populate(db, synthetic_rows, scale, args.seed, admin_id)
+            synthetic_rows = scale
+            result["index"] = measure_index(db, search_index)
+            result["find_matches"] = measure_find_matches(db, scale, args, salt)
+            result["get_embedding"] = await measure_get_embedding(inference, photos.take(scale, args.endpoint_queries))
+            result["search_api"] = await measure_search_api(client, headers, photos.take(scale, args.endpoint_queries), args)
+            result["registration"] = await measure_registration(client, headers, api, photos.take(scale, args.registrations), args)
+            result["peak_rss_mb"] = peak_rss_mb()
+            report["results"].append(result)
+            print_scale(result)
+    await api.registration_jobs.stop()
+    inference.shutdown()
+    return report
+
+
+def print_scale(result: dict) -> None:
+    populate, index, matches = result["populate"], result["index"], result["find_matches"]
+    registration = result["registration"]
+    print(f"populate      {populate['rows']:,} rows at {populate['rows_per_s']} rows/s")
+    print(f"index         rebuild {index['rebuild_seconds']}s, from file {index['load_from_file_seconds']}s, "
+          f"{index['memory_mb']} MB, trained={index['trained']}")
+    for name in ("approximate", "exact", "many"):
+        stats = matches[name]
+        if stats["count"]:
+            print(f"find_matches  {name:<12} p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms")
+    for name in ("get_embedding", "search_api"):
+        stats = result[name]
+        print(f"{name:<14}p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms")
+    print(f"registration  {registration['jobs_per_s']} jobs/s ({registration['succeeded']}/{registration['jobs']} succeeded), "
+          f"job p95 {registration['job'].get('p95_ms')} ms")
+    print(f"peak RSS      {result['peak_rss_mb']} MB")
+
+
+# ==============================================================================
+# SECTION: Comparing runs
+# ==============================================================================
+
+def flatten(value, prefix: str = "") -> dict:
+    """Numeric leaves of a result as {"find_matches.approximate.p95_ms": 1.2, ...}."""
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}{key}."))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix[:-1]: value}
+    return {}
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = {result["cases"]: flatten(result) for result in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {result["cases"]: flatten(result) for result in json.load(f)["results"]}
+    regressions = 0
+    print(f"{'cases':>9}  {'metric':<40}{'old':>12}{'new':>12}{'change':>9}")
+    for cases in sorted(old.keys() & new.keys()):
+        for metric in sorted(old[cases].keys() & new[cases].keys()):
+            if not metric.endswith(("_ms", "_seconds", "_mb", "_per_s")) or metric.endswith("max_ms"):
+                continue  # A single slow call makes max_ms too noisy to compare
+            before, after = old[cases][metric], new[cases][metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric.endswith("_per_s") else change
+            flag = "  <-- worse" if worse > REGRESSION_TOLERANCE else ""
+            regressions += bool(flag)
+            print(f"{cases:>9,}  {metric:<40}{before:>12}{after:>12}{change:>+9.1%}{flag}")
+    print(f"{regressions} metric(s) more than {REGRESSION_TOLERANCE:.0%} worse")
+
+
+def main(args) -> None:
+    if args.compare:
+        compare(*args.compare)
+        return
+    output = os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="run_suite-")
+    os.makedirs(workdir, exist_ok=True)
+    if os.path.exists(os.path.join(workdir, "benchmark.db")):
+        raise SystemExit(f"{workdir} already holds a benchmark database; use an empty folder.")
+    prepare_workdir(workdir)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        os.chdir(BACKEND_DIR)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated case counts, ascending")
+    parser.add_argument("--model", choices=("stub", "real"), default="stub", help="Face model used for photos")
+    parser.add_argument("--photos", help="Folder of real face photos (required with --model real)")
+    parser.add_argument("--queries", type=int, default=200, help="find_matches queries per scale")
+    parser.add_argument("--exact-queries", type=int, default=20, help="Exact-scan queries per scale")
+    parser.add_argument("--group-size", type=int, default=8, help="Faces per find_matches_many call")
+    parser.add_argument("--endpoint-queries", type=int, default=100, help="Search requests (and get_embedding calls) per scale")
+    parser.add_argument("--registrations", type=int, default=200, help="Registrations per scale")
+    parser.add_argument("--concurrency", type=int, default=8, help="Registration requests in flight")
+    parser.add_argument("--strictness", type=float, default=0.4)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch folder for the database, index and photos (default: a temp folder)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch folder afterwards")
+    parser.add_argument("--output", default="suite_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    args = parser.parse_args()
+    if not args.compare:
+        args.scales = sorted(int(scale) for scale in args.scales.split(","))
+        if args.model == "real" and not args.photos:
+            parser.error("--model real needs --photos")
+    main(args)
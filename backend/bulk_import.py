@@ -0,0 +1,185 @@
+# backend/bulk_import.py
+
+import csv
+import io
+import os
+import zipfile
+from typing import Callable, Dict, Iterator, List
+
+import auto_matcher
+import db
+import inference
+import photo_store
+import thumbnails
+
+REPORT_FIELDS = ["row", "photo", "status", "person_id", "error"]
+REQUIRED_COLUMNS = {"name", "age", "gender", "loc", "photo"}
+
+# Rows are embedded and inserted this many at a time; each batch is one DB transaction.
+DEFAULT_BATCH_SIZE = 64
+# Images per inference job; several jobs run in parallel across the worker pool.
+EMBED_CHUNK_SIZE = 8
+
+
+class PhotoSource:
+    """Reads photos by relative name from either a directory or a ZIP archive."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self._zip is None and not os.path.isdir(path):
+            raise ValueError(f"Photo source must be a directory or a ZIP file: {path}")
+
+    def read(self, name: str) -> bytes:
+        name = name.replace("\\", "/").lstrip("/")
+        if self._zip is not None:
+            try:
+                return self._zip.read(name)
+            except KeyError:
+                raise FileNotFoundError(f"'{name}' is not in the archive")
+        full_path = os.path.normpath(os.path.join(self.path, name))
+        if not full_path.startswith(os.path.normpath(self.path) + os.sep):
+            raise FileNotFoundError(f"'{name}' is outside the photo directory")
+        with open(full_path, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+
+
+def read_report(report_path: str) -> Dict[int, dict]:
+    """Loads an existing report keyed by manifest row number (later entries win)."""
+    if not os.path.exists(report_path):
+        return {}
+    with open(report_path, newline="", encoding="utf-8") as f:
+        return {int(entry["row"]): entry for entry in csv.DictReader(f)}
+
+
+def _manifest_rows(manifest: io.TextIOBase, done_rows: set) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(manifest)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Manifest is missing columns: {', '.join(sorted(missing))}")
+    for row_number, row in enumerate(reader, start=1):
+        if row_number not in done_rows:
+            yield row_number, row
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _import_batch(batch: list, photos: PhotoSource, user_id: int) -> List[dict]:
+    report = {}
+    prepared = []  # (row_number, record, image_bytes, photo_name)
+    for row_number, row in batch:
+        photo_name = (row.get("photo") or "").strip()
+        entry = {"row": row_number, "photo": photo_name, "status": "failed", "person_id": "", "error": ""}
+        report[row_number] = entry
+        try:
+            record = {
+                "name": row["name"].strip(),
+                "age": int(row["age"]),
+                "gender": row["gender"].strip(),
+                "loc": row["loc"].strip(),
+            }
+            if not photo_name:
+                raise ValueError("No photo given")
+            prepared.append((row_number, record, photos.read(photo_name), photo_name))
+        except (ValueError, KeyError, OSError) as e:
+            entry["error"] = str(e)
+
+    # Photos already in the store (or repeated within this batch) reuse their embedding
+    photo_paths = [photo_store.locate(image, photo_name) for _, _, image, photo_name in prepared]
+    known = {}
+    for photo_path in set(photo_paths):
+        if os.path.exists(photo_path):
+            embedding = db.get_embedding_by_photo(photo_path)
+            if embedding is not None:
+                known[photo_path] = embedding
+    to_embed = {}
+    for photo_path, (_, _, image, _) in zip(photo_paths, prepared):
+        if photo_path not in known:
+            to_embed.setdefault(photo_path, image)
+    known.update(zip(to_embed, inference.get_embeddings_batch(list(to_embed.values()), chunk_size=EMBED_CHUNK_SIZE)))
+
+    to_insert = []  # (row_number, record, embedding)
+    written_paths = []
+    for photo_path, (row_number, record, image, photo_name) in zip(photo_paths, prepared):
+        embedding = known[photo_path]
+        if isinstance(embedding, BaseException):
+            report[row_number]["error"] = str(embedding)
+            continue
+        photo_path, created = photo_store.save(image, photo_name)
+        if created:
+            written_paths.append(photo_path)
+        thumbnails.generate_quietly(photo_path, image)
+        to_insert.append((row_number, dict(record, photo_path=photo_path), embedding))
+
+    new_ids = []
+    error = "Database unavailable"
+    try:
+        new_ids = db.add_persons_bulk([r for _, r, _ in to_insert], [e for _, _, e in to_insert], user_id)
+    except Exception as e:
+        error = f"Database insert failed: {e}"
+    if to_insert and not new_ids:
+        # The batch was rolled back as a whole; don't leave orphaned photo files behind
+        # (photos that were already stored belong to other cases and stay).
+        for path in written_paths:
+            os.remove(path)
+            thumbnails.delete(path)
+        for row_number, _, _ in to_insert:
+            report[row_number]["error"] = error
+    for (row_number, record, embedding), person_id in zip(to_insert, new_ids):
+        report[row_number].update(status="ok", person_id=person_id)
+        auto_matcher.schedule(person_id, embedding, record["name"])
+    return [report[row_number] for row_number, _ in batch]
+
+
+def import_cases(
+    manifest_path: str,
+    photo_source: str,
+    user_id: int,
+    report_path: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Imports cases listed in a CSV manifest (columns: name, age, gender, loc, photo)
+    with photos read from a directory or ZIP archive.
+
+    Every processed row is appended to the CSV report at `report_path`. Rows that
+    the report already marks as 'ok' are skipped, so re-running the same import
+    after an interruption resumes where it stopped.
+    """
+    previous = read_report(report_path)
+    done_rows = {row for row, entry in previous.items() if entry["status"] == "ok"}
+    summary = {"imported": 0, "failed": 0, "skipped": len(done_rows)}
+
+    photos = PhotoSource(photo_source)
+    new_report = not os.path.exists(report_path)
+    try:
+        with open(manifest_path, newline="", encoding="utf-8-sig") as manifest, \
+                open(report_path, "a", newline="", encoding="utf-8") as report_file:
+            writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+            if new_report:
+                writer.writeheader()
+            for batch in _batches(_manifest_rows(manifest, done_rows), batch_size):
+                entries = _import_batch(batch, photos, user_id)
+                writer.writerows(entries)
+                report_file.flush()
+                for entry in entries:
+                    summary["imported" if entry["status"] == "ok" else "failed"] += 1
+                if on_progress:
+                    on_progress(dict(summary))
+    finally:
+        photos.close()
+    return summary
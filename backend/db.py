@@ -1,11 +1,21 @@
 # backend/db.py
 
-import mysql.connector
-from mysql.connector import Error
-from typing import List, Dict, Any
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+from typing import Iterator, List, Dict, Any
 import numpy as np
 from passlib.context import CryptContext
 
+import embedding_codec
+import identity_cache
+import notification_bus
+from db_pool import ConnectionPool, PoolTimeoutError
+from search_index import EmbeddingIndex, person_index, found_index, PERSON_INDEX_PATH, FOUND_INDEX_PATH
+
 # --- IMPORTANT: MySQL Connection Configuration ---
 # For production, these should be loaded from environment variables.
 db_config = {
@@ -15,19 +25,49 @@ db_config = {
     "database": "missing_person_db"
 }
 
+# --- Storage Backend ---
+# "mysql" uses the server configured above. "sqlite" keeps everything in one
+# local file (see sqlite_backend.py), for single-machine installs and load tests
+# without a database server. Every function below runs unchanged on both.
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql").lower()
+
+if DB_BACKEND == "sqlite":
+    import sqlite_backend
+    from sqlite_backend import Error
+
+    def _connect():
+        return sqlite_backend.connect()
+elif DB_BACKEND == "mysql":
+    import mysql.connector
+    from mysql.connector import Error
+
+    def _connect():
+        return mysql.connector.connect(**db_config)
+else:
+    raise ValueError(f"Unknown DB_BACKEND: {DB_BACKEND} (expected 'mysql' or 'sqlite')")
+
+# --- Connection Pool ---
+# Connections are reused across requests instead of reconnecting for every query.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))
+pool = ConnectionPool(_connect, error=Error, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+
 # --- Password Hashing Setup ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- Database Connection Helper ---
 def get_db_connection():
-    """Establishes and returns a connection to the MySQL database."""
+    """Checks a connection out of the pool; calling close() on it returns it."""
     try:
-        conn = mysql.connector.connect(**db_config)
-        return conn
-    except Error as e:
-        print(f"Error connecting to MySQL Database: {e}")
+        return pool.get_connection()
+    except (Error, PoolTimeoutError) as e:
+        print(f"Error connecting to the database ({DB_BACKEND}): {e}")
         return None
 
+def pool_stats() -> Dict[str, int]:
+    """Returns connection pool counters (checkouts, waits, prepared statement reuse, ...)."""
+    return pool.stats()
+
 # ==============================================================================
 # SECTION: User Management
 # ==============================================================================
@@ -43,6 +83,7 @@ def create_user(username: str, hashed_password: str, role: str = 'user') -> None
             (username, hashed_password, role)
         )
         conn.commit()
+        identity_cache.invalidate(username)
     finally:
         cursor.close()
         conn.close()
@@ -51,11 +92,24 @@ def get_user_id(username: str) -> int | None:
     """Returns the user ID for a given username, or None if not found."""
     conn = get_db_connection()
     if conn is None: return None
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT id FROM users WHERE username = %s", (username,))
+        sql = "SELECT id FROM users WHERE username = %s"
+        cursor = conn.prepared(sql)
+        cursor.execute(sql, (username,))
         user = cursor.fetchone()
+        cursor.fetchall()  # Drain, so the prepared statement can be re-executed
         return user['id'] if user else None
+    finally:
+        conn.close()
+
+def get_admin_ids() -> List[int]:
+    """Returns the ids of all admin users."""
+    conn = get_db_connection()
+    if conn is None: return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM users WHERE role = 'admin'")
+        return [row[0] for row in cursor.fetchall()]
     finally:
         cursor.close()
         conn.close()
@@ -94,175 +148,874 @@ def verify_user_hashed(username: str, plain_password: str) -> int | None:
 # SECTION: Missing Person Case Management
 # ==============================================================================
 
-def add_person(data: dict, embedding: np.ndarray, user_id: int) -> None:
-    """Inserts a new missing-person record into the 'persons' table."""
+def add_person(data: dict, embedding: np.ndarray, user_id: int) -> int | None:
+    """Inserts a new missing-person record into the 'persons' table and returns its id."""
     conn = get_db_connection()
-    if conn is None: return
+    if conn is None: return None
     cursor = conn.cursor()
     try:
         sql = "INSERT INTO persons (name, age, gender, loc, photo_path, embedding, created_by) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-        values = (data.get("name"), data.get("age"), data.get("gender"), data.get("loc"), data.get("photo_path"), embedding.astype(np.float32).tobytes(), user_id)
+        values = (data.get("name"), data.get("age"), data.get("gender"), data.get("loc"), data.get("photo_path"), embedding_codec.encode(embedding), user_id)
         cursor.execute(sql, values)
         conn.commit()
+        person_index.add(cursor.lastrowid, embedding)
+        return cursor.lastrowid
     finally:
         cursor.close()
         conn.close()
 
-def find_matches(query_embedding: np.ndarray, strictness: float) -> List[Dict[str, Any]]:
-    """Finds all persons matching a query embedding based on cosine similarity."""
-    from face_utils import cosine  # Local import to avoid circular dependency
+def add_persons_bulk(records: List[dict], embeddings: List[np.ndarray], user_id: int) -> List[int]:
+    """
+    Inserts many missing-person records in one executemany transaction and
+    returns their new ids in record order (empty if nothing was written).
+    """
+    if not records:
+        return []
     conn = get_db_connection()
     if conn is None: return []
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT id, name, age, gender, loc, photo_path, embedding FROM persons")
-        all_persons = cursor.fetchall()
-        matches = []
-        for person in all_persons:
-            db_embedding = np.frombuffer(person['embedding'], dtype=np.float32)
-            similarity = cosine(query_embedding, db_embedding)
-            if similarity >= strictness:
-                del person['embedding']
-                person['similarity'] = round(similarity, 4)
-                matches.append(person)
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
-        return matches
+        # Tags this batch's rows so their ids can be read back: auto-increment ids
+        # of a multi-row INSERT are only ascending, not necessarily consecutive
+        # (auto_increment_increment > 1, innodb_autoinc_lock_mode = 2).
+        batch = uuid.uuid4().hex
+        sql = "INSERT INTO persons (name, age, gender, loc, photo_path, embedding, created_by, import_batch) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+        values = [
+            (data.get("name"), data.get("age"), data.get("gender"), data.get("loc"), data.get("photo_path"), embedding_codec.encode(embedding), user_id, batch)
+            for data, embedding in zip(records, embeddings)
+        ]
+        cursor.executemany(sql, values)
+        # lastrowid is the first id of the statement, so the primary key bounds the scan
+        cursor.execute("SELECT id FROM persons WHERE id >= %s AND import_batch = %s ORDER BY id", (cursor.lastrowid, batch))
+        new_ids = [row[0] for row in cursor.fetchall()]
+        if len(new_ids) != len(values):
+            conn.rollback()
+            raise Error(f"Expected {len(values)} new rows for batch {batch}, found {len(new_ids)}")
+        conn.commit()
+        for person_id, embedding in zip(new_ids, embeddings):
+            person_index.add(person_id, embedding)
+        return new_ids
     finally:
         cursor.close()
         conn.close()
 
-def get_user_cases(user_id: int) -> List[Dict[str, Any]]:
-    """Returns all active cases submitted by a specific user."""
+def get_embedding_by_photo(photo_path: str) -> np.ndarray | None:
+    """
+    Returns the stored embedding of a case (active or found) that uses this
+    photo. Photos are stored by content hash, so a match means the same image.
+    """
+    conn = get_db_connection()
+    if conn is None: return None
+    try:
+        # Derived tables rather than parenthesised SELECTs, which SQLite doesn't accept
+        sql = """
+            SELECT embedding FROM (SELECT embedding FROM persons WHERE photo_path = %s AND embedding IS NOT NULL LIMIT 1) AS p
+            UNION ALL
+            SELECT embedding FROM (SELECT embedding FROM found_persons WHERE photo_path = %s AND embedding IS NOT NULL LIMIT 1) AS f
+            LIMIT 1
+        """
+        cursor = conn.prepared(sql)
+        cursor.execute(sql, (photo_path, photo_path))
+        row = cursor.fetchone()
+        cursor.fetchall()  # Drain, so the prepared statement can be re-executed
+        return embedding_codec.decode(bytes(row['embedding'])) if row else None
+    finally:
+        conn.close()
+
+def get_photo_paths(table: str) -> List[tuple[int, str]]:
+    """Returns (id, photo_path) for every row of 'persons' or 'found_persons' that has a photo."""
+    if table not in ("persons", "found_persons"):
+        raise ValueError(f"Unknown table: {table}")
+    conn = get_db_connection()
+    if conn is None: return []
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT id, photo_path FROM {table} WHERE photo_path IS NOT NULL")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def update_photo_paths(table: str, moves: List[tuple[str, int]]) -> int:
+    """
+    Points rows of 'persons' or 'found_persons' at new photo paths; moves are
+    (photo_path, id) pairs. Returns the number of rows changed, and raises
+    Error when the database is unavailable: callers delete the old files next.
+    """
+    if table not in ("persons", "found_persons"):
+        raise ValueError(f"Unknown table: {table}")
+    conn = get_db_connection()
+    if conn is None:
+        raise Error("Database unavailable")
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(f"UPDATE {table} SET photo_path = %s WHERE id = %s", moves)
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_referenced_photo_paths(photo_paths: List[str]) -> set:
+    """
+    The subset of photo_paths that any active or found case still points at.
+    Raises Error when the database is unavailable, so nothing looks unreferenced by mistake.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        raise Error("Database unavailable")
+    cursor = conn.cursor()
+    referenced = set()
+    try:
+        for start in range(0, len(photo_paths), MATCH_FETCH_BATCH):
+            chunk = photo_paths[start:start + MATCH_FETCH_BATCH]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f"SELECT photo_path FROM persons WHERE photo_path IN ({placeholders}) "
+                f"UNION SELECT photo_path FROM found_persons WHERE photo_path IN ({placeholders})",
+                chunk + chunk
+            )
+            referenced.update(row[0] for row in cursor.fetchall())
+        return referenced
+    finally:
+        cursor.close()
+        conn.close()
+
+def _fetch_embeddings(cursor, person_ids: List[int], table: str = "persons") -> tuple[List[int], np.ndarray]:
+    """Fetches (ids, embedding matrix) for cases in `table`, all of them when person_ids is None."""
+    if person_ids is None:
+        cursor.execute(f"SELECT id, embedding FROM {table} WHERE embedding IS NOT NULL")
+        rows = cursor.fetchall()
+    else:
+        rows = []
+        for start in range(0, len(person_ids), 1000):
+            chunk = person_ids[start:start + 1000]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"SELECT id, embedding FROM {table} WHERE id IN ({placeholders}) AND embedding IS NOT NULL", chunk)
+            rows.extend(cursor.fetchall())
+    ids = [row[0] for row in rows]
+    return ids, embedding_codec.decode_many([bytes(row[1]) for row in rows])
+
+def get_case_embeddings() -> tuple[List[int], np.ndarray]:
+    """All active cases' (ids, embedding matrix), decoded from the table at their stored precision."""
+    conn = get_db_connection()
+    if conn is None: return [], np.empty((0, embedding_codec.EMBEDDING_DIM), dtype=np.float32)
+    cursor = conn.cursor()
+    try:
+        return _fetch_embeddings(cursor, None)
+    finally:
+        cursor.close()
+        conn.close()
+
+def _reconcile_index(cursor, index: EmbeddingIndex, table: str) -> tuple[int, int]:
+    """
+    Brings an index in line with `table`: adds rows it lacks and removes ids
+    no longer in the table. Returns (added, removed).
+
+    An id is only removed after a second look confirms it is gone, so a case
+    this process inserted after the id list was read is never dropped.
+    """
+    cursor.execute(f"SELECT id FROM {table} WHERE embedding IS NOT NULL")
+    db_ids = {row[0] for row in cursor.fetchall()}
+    indexed_ids = set(index.ids.tolist())
+    missing_ids, embeddings = _fetch_embeddings(cursor, sorted(db_ids - indexed_ids), table)
+    for person_id, embedding in zip(missing_ids, embeddings):
+        index.add(person_id, embedding)
+    stale_ids = sorted(indexed_ids - db_ids)
+    removed = 0
+    for start in range(0, len(stale_ids), MATCH_FETCH_BATCH):
+        chunk = stale_ids[start:start + MATCH_FETCH_BATCH]
+        cursor.execute(f"SELECT id FROM {table} WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        still_there = {row[0] for row in cursor.fetchall()}
+        for stale_id in chunk:
+            if stale_id not in still_there and index.remove(stale_id):
+                removed += 1
+    return len(missing_ids), removed
+
+def _load_index(index: EmbeddingIndex, table: str, index_path: str) -> int:
+    """
+    Loads a search index over `table`, from its on-disk file when available.
+    The file is reconciled against the table, so only cases added or removed
+    since it was written are fetched; the IVF partition is (re)trained once
+    the table is big enough, and the result is written back to disk.
+    """
+    conn = get_db_connection()
+    if conn is None: return 0
+    cursor = conn.cursor()
+    try:
+        if index.load(index_path):
+            _reconcile_index(cursor, index, table)
+        else:
+            ids, embeddings = _fetch_embeddings(cursor, None, table)
+            index.build(ids, embeddings)
+        if index.needs_training():
+            index.train()
+        _save_index(index, index_path)
+        return len(index)
+    finally:
+        cursor.close()
+        conn.close()
+
+def _save_index(index: EmbeddingIndex, index_path: str) -> None:
+    if not index.loaded:
+        return  # Only holds rows added since startup; saving it would just force a bigger reconcile later
+    try:
+        index.save(index_path)
+    except OSError as e:
+        print(f"Error saving search index: {e}")
+
+def load_person_index(index_path: str = PERSON_INDEX_PATH) -> int:
+    """Loads the active-case search index (see _load_index)."""
+    return _load_index(person_index, "persons", index_path)
+
+def load_found_index(index_path: str = FOUND_INDEX_PATH) -> int:
+    """Loads the found-persons archive index (see _load_index)."""
+    return _load_index(found_index, "found_persons", index_path)
+
+_index_load_lock = threading.Lock()
+
+def ensure_person_index() -> None:
+    """Loads the search index unless it already is; concurrent callers wait for one load."""
+    if person_index.loaded:
+        return
+    with _index_load_lock:
+        if not person_index.loaded:
+            load_person_index()
+
+_found_index_load_lock = threading.Lock()
+
+def ensure_found_index() -> None:
+    """Loads the found-persons index unless it already is."""
+    if found_index.loaded:
+        return
+    with _found_index_load_lock:
+        if not found_index.loaded:
+            load_found_index()
+
+# Each API process keeps its own indexes; this often, they pick up cases that
+# other processes registered, imported or marked found (0 disables, for a single process).
+INDEX_SYNC_SECONDS = float(os.environ.get("INDEX_SYNC_SECONDS", 10))
+
+def sync_indexes() -> Dict[str, tuple[int, int]]:
+    """Reconciles every loaded index with its table; returns (added, removed) per table."""
+    changes = {}
+    for index, table in ((person_index, "persons"), (found_index, "found_persons")):
+        if not index.loaded:
+            continue
+        conn = get_db_connection()
+        if conn is None: return changes
+        cursor = conn.cursor()
+        try:
+            changes[table] = _reconcile_index(cursor, index, table)
+        finally:
+            cursor.close()
+            conn.close()
+    return changes
+
+def save_person_index(index_path: str = PERSON_INDEX_PATH) -> None:
+    """Persists the active-case search index so the next startup only reconciles changes."""
+    _save_index(person_index, index_path)
+
+def save_found_index(index_path: str = FOUND_INDEX_PATH) -> None:
+    """Persists the found-persons index, like save_person_index."""
+    _save_index(found_index, index_path)
+
+MATCH_FETCH_BATCH = 256
+
+def _fetch_match_rows(conn, person_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Fetches display columns for matched case ids, keyed by id."""
+    rows = {}
+    for start in range(0, len(person_ids), MATCH_FETCH_BATCH):
+        chunk = person_ids[start:start + MATCH_FETCH_BATCH]
+        # Pad to a power of two so a handful of prepared statements cover every result size
+        slots = 1 << (len(chunk) - 1).bit_length()
+        sql = f"SELECT id, name, age, gender, loc, photo_path FROM persons WHERE id IN ({', '.join(['%s'] * slots)})"
+        cursor = conn.prepared(sql)
+        cursor.execute(sql, chunk + [chunk[-1]] * (slots - len(chunk)))
+        rows.update((row['id'], row) for row in cursor.fetchall())
+    return rows
+
+def get_cases_by_ids(person_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Display columns of the given active cases, keyed by id."""
+    if not person_ids:
+        return {}
+    conn = get_db_connection()
+    if conn is None: return {}
+    try:
+        return _fetch_match_rows(conn, list(person_ids))
+    finally:
+        conn.close()
+
+def _attach_similarity(hits: List[tuple], rows: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    matches = []
+    for person_id, similarity in hits:
+        person = rows.get(person_id)
+        if person is None:
+            continue  # Deleted by another worker since the index was loaded
+        matches.append(dict(person, similarity=round(similarity, 4)))
+    return matches
+
+# With a compact index, this many times top_k candidates are re-ranked against the stored embeddings.
+RERANK_FACTOR = int(os.environ.get("RERANK_FACTOR", 4))
+
+def _candidate_params(strictness: float, top_k: int | None) -> tuple[float, int | None]:
+    """Loosens threshold and top_k for the first, compact-score stage of a two-stage search."""
+    if not person_index.is_compact:
+        return strictness, top_k
+    return strictness - person_index.score_margin, None if top_k is None else top_k * RERANK_FACTOR
+
+def _rerank(conn, query_embedding: np.ndarray, candidates: List[tuple], strictness: float, top_k: int | None) -> List[tuple]:
+    """
+    Re-scores compact-index candidates against the stored embeddings. Those
+    are float32 whenever the index is compact (see embedding_codec), so the
+    final scores are exact, except for rows written with a compact
+    EMBEDDING_STORAGE before the index was switched, which keep that precision.
+    """
+    if not person_index.is_compact or not candidates:
+        return candidates
+    cursor = conn.cursor()
+    try:
+        ids, embeddings = _fetch_embeddings(cursor, [person_id for person_id, _ in candidates])
+    finally:
+        cursor.close()
+    query = EmbeddingIndex._normalize(query_embedding)
+    scores = EmbeddingIndex._normalize(embeddings) @ query
+    keep = scores >= strictness
+    return EmbeddingIndex._ranked(np.array(ids, dtype=np.int64)[keep], scores[keep], top_k)
+
+def index_stats() -> Dict[str, Any]:
+    """Size and memory footprint of the active-case search index."""
+    return {
+        "cases": len(person_index),
+        "encoding": person_index.encoding,
+        "memory_bytes": person_index.memory_bytes,
+        "ivf_lists": len(person_index.centroids) if person_index.is_trained else 0,
+    }
+
+def find_matches(query_embedding: np.ndarray, strictness: float, nprobe: int | None = None, exact: bool = False, top_k: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Finds persons matching a query embedding based on cosine similarity, best
+    first and at most `top_k` of them when given.
+    Uses the approximate index unless `exact` is set; `nprobe` trades recall for speed.
+    """
+    ensure_person_index()
+    threshold, candidate_k = _candidate_params(strictness, top_k)
+    hits = person_index.search(query_embedding, threshold, nprobe=0 if exact else nprobe, top_k=candidate_k)
+    if not hits:
+        return []
+    conn = get_db_connection()
+    if conn is None: return []
+    try:
+        hits = _rerank(conn, query_embedding, hits, strictness, top_k)
+        rows = _fetch_match_rows(conn, [person_id for person_id, _ in hits])
+        return _attach_similarity(hits, rows)
+    finally:
+        conn.close()
+
+def find_matches_many(query_embeddings: List[np.ndarray], strictness: float, nprobe: int | None = None, exact: bool = False, top_k: int | None = None) -> List[List[Dict[str, Any]]]:
+    """
+    find_matches for several query embeddings at once (e.g. every face in a
+    group photo). The index scores all of them in one pass and case rows are
+    fetched once for the union of matches. Returns one match list per query.
+    """
+    if not query_embeddings:
+        return []
+    ensure_person_index()
+    threshold, candidate_k = _candidate_params(strictness, top_k)
+    all_hits = person_index.search_many(np.stack(query_embeddings), threshold, nprobe=0 if exact else nprobe, top_k=candidate_k)
+    if not any(all_hits):
+        return [[] for _ in all_hits]
+    conn = get_db_connection()
+    if conn is None: return [[] for _ in all_hits]
+    try:
+        all_hits = [_rerank(conn, q, hits, strictness, top_k) for q, hits in zip(query_embeddings, all_hits)]
+        rows = _fetch_match_rows(conn, list({person_id for hits in all_hits for person_id, _ in hits}))
+        return [_attach_similarity(hits, rows) for hits in all_hits]
+    finally:
+        conn.close()
+
+def stream_matches(query_embedding: np.ndarray, strictness: float, nprobe: int | None = None, exact: bool = False, top_k: int | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    Progressive version of find_matches. Yields a 'candidates' event after each
+    scored chunk of the index with the matches that entered the running top_k,
+    then a 'done' event with the final ranked list. With a compact index the
+    candidate scores are approximate; the final list is re-ranked against the stored embeddings.
+    """
+    ensure_person_index()
+    conn = get_db_connection()
+    if conn is None:
+        yield {"event": "done", "matches": []}
+        return
+    try:
+        rows: Dict[int, Dict[str, Any]] = {}
+        ranked = []
+        threshold, candidate_k = _candidate_params(strictness, top_k)
+        for new_hits, ranked, scanned, total in person_index.search_iter(
+            query_embedding, threshold, nprobe=0 if exact else nprobe, top_k=candidate_k
+        ):
+            if not new_hits:
+                continue
+            rows.update(_fetch_match_rows(conn, [person_id for person_id, _ in new_hits]))
+            yield {"event": "candidates", "matches": _attach_similarity(new_hits, rows), "scanned": scanned, "total": total}
+        ranked = _rerank(conn, query_embedding, ranked, strictness, top_k)
+        yield {"event": "done", "matches": _attach_similarity(ranked, rows)}
+    finally:
+        conn.close()
+
+# Columns a case listing may project; 'id' is always returned because it is the page cursor.
+CASE_COLUMNS = ("id", "name", "age", "gender", "loc", "photo_path")
+
+def _case_columns(fields: List[str] | None, allowed: Dict[str, str]) -> str:
+    """Builds the SELECT list for the requested fields, mapping names to SQL expressions."""
+    unknown = set(fields or []) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    names = [name for name in allowed if not fields or name == "id" or name in fields]
+    return ", ".join(f"{allowed[name]} AS {name}" for name in names)
+
+def _keyset(before_id: int | None, limit: int | None, id_column: str = "id") -> tuple[str, str, list]:
+    """Returns (extra WHERE condition, ORDER/LIMIT tail, params) for newest-first keyset pagination."""
+    condition, params = "", []
+    if before_id is not None:
+        condition = f" AND {id_column} < %s"
+        params.append(before_id)
+    tail = f" ORDER BY {id_column} DESC"
+    if limit is not None:
+        tail += " LIMIT %s"
+        params.append(limit)
+    return condition, tail, params
+
+def get_user_cases(user_id: int, before_id: int | None = None, limit: int | None = None, fields: List[str] | None = None) -> List[Dict[str, Any]]:
+    """Returns active cases submitted by a specific user, newest first, optionally one page at a time."""
+    columns = _case_columns(fields, {name: name for name in CASE_COLUMNS})
+    condition, tail, page_params = _keyset(before_id, limit)
     conn = get_db_connection()
     if conn is None: return []
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT id, name, age, gender, loc, photo_path FROM persons WHERE created_by = %s ORDER BY id DESC", (user_id,))
+        cursor.execute(f"SELECT {columns} FROM persons WHERE created_by = %s{condition}{tail}", [user_id] + page_params)
         return cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
 
-def get_all_active_cases() -> List[Dict[str, Any]]:
-    """Returns all active cases, joined with the creator's username."""
+def get_all_active_cases(before_id: int | None = None, limit: int | None = None, fields: List[str] | None = None) -> List[Dict[str, Any]]:
+    """Returns active cases joined with the creator's username, newest first, optionally one page at a time."""
+    allowed = {name: f"p.{name}" for name in CASE_COLUMNS}
+    allowed["created_by_user"] = "u.username"
+    columns = _case_columns(fields, allowed)
+    condition, tail, params = _keyset(before_id, limit, id_column="p.id")
     conn = get_db_connection()
     if conn is None: return []
     cursor = conn.cursor(dictionary=True)
     try:
-        sql = """
-            SELECT p.id, p.name, p.age, p.gender, p.loc, p.photo_path, u.username as created_by_user
+        sql = f"""
+            SELECT {columns}
             FROM persons p
             LEFT JOIN users u ON p.created_by = u.id
-            ORDER BY p.id DESC
+            WHERE 1 = 1{condition}{tail}
         """
-        cursor.execute(sql)
+        cursor.execute(sql, params)
         return cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
-        
-def get_case_creator(person_id: int) -> int | None:
-    """Gets the user_id of the user who created a specific case."""
+
+# Columns moved into the found_persons archive; both tables share this structure.
+_ARCHIVE_COLUMNS = "id, name, age, gender, loc, photo_path, embedding, created_by"
+
+def mark_persons_as_found(person_ids: List[int], notification_message: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Moves cases from 'persons' to 'found_persons' in a single transaction and,
+    if `notification_message` is given (a template with a {name} field), queues
+    a notification for each case's creator in that same transaction.
+
+    The rows are locked with SELECT ... FOR UPDATE first, so when admins close
+    the same case concurrently exactly one of them moves it. Returns
+    {"id", "name", "created_by"} for the cases that were moved.
+    """
+    person_ids = list(dict.fromkeys(person_ids))
+    if not person_ids:
+        return []
     conn = get_db_connection()
-    if conn is None: return None
-    cursor = conn.cursor()
+    if conn is None: return []
+    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT created_by FROM persons WHERE id = %s", (person_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+        conn.start_transaction()
+        placeholders = ', '.join(['%s'] * len(person_ids))
+        cursor.execute(f"SELECT id, name, created_by, embedding FROM persons WHERE id IN ({placeholders}) FOR UPDATE", person_ids)
+        moved = cursor.fetchall()
+        if not moved:
+            conn.rollback()
+            return []
+        moved_ids = [row['id'] for row in moved]
+        placeholders = ', '.join(['%s'] * len(moved_ids))
+        cursor.execute(
+            f"INSERT INTO found_persons ({_ARCHIVE_COLUMNS}) SELECT {_ARCHIVE_COLUMNS} FROM persons WHERE id IN ({placeholders})",
+            moved_ids,
+        )
+        cursor.execute(f"DELETE FROM persons WHERE id IN ({placeholders})", moved_ids)
+        notifications = []
+        if notification_message is not None:
+            # One INSERT per notification, so each event below carries its row's real id
+            for row in moved:
+                if row['created_by'] and row['name']:
+                    message = notification_message.format(name=row['name'])[:255]
+                    cursor.execute("INSERT INTO notifications (user_id, message) VALUES (%s, %s)", (row['created_by'], message))
+                    notifications.append(cursor.lastrowid)
+            notifications = _fetch_notifications(cursor, notifications)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
 
-def get_case_name(person_id: int) -> str | None:
-    """Gets the name associated with a specific case ID."""
+    for row in moved:
+        person_index.remove(row['id'])
+        if found_index.loaded and row['embedding']:
+            found_index.add(row['id'], embedding_codec.decode(bytes(row['embedding'])))
+    _publish_notifications(notifications)
+    return [{"id": row['id'], "name": row['name'], "created_by": row['created_by']} for row in moved]
+
+def mark_person_as_found(person_id: int, notification_message: str | None = None) -> Dict[str, Any] | None:
+    """Moves one case to 'found_persons' (see mark_persons_as_found); None if it isn't an active case."""
+    moved = mark_persons_as_found([person_id], notification_message)
+    return moved[0] if moved else None
+
+def get_found_cases(before_id: int | None = None, limit: int | None = None, fields: List[str] | None = None) -> List[Dict[str, Any]]:
+    """Returns cases from the 'found_persons' archive table, newest first, optionally one page at a time."""
+    columns = _case_columns(fields, {name: name for name in CASE_COLUMNS})
+    condition, tail, params = _keyset(before_id, limit)
+    conn = get_db_connection()
+    if conn is None: return []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {columns} FROM found_persons WHERE 1 = 1{condition}{tail}", params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+# ==============================================================================
+# SECTION: Notification Management
+# ==============================================================================
+
+def _fetch_notifications(cursor, notification_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Reads freshly inserted notifications back through a dictionary cursor, so
+    pushed events carry the same is_read and created_at values (database
+    types and clock) as get_notifications_by_user returns.
+    """
+    if not notification_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(notification_ids))
+    cursor.execute(
+        f"SELECT id, user_id, message, is_read, created_at FROM notifications WHERE id IN ({placeholders}) ORDER BY id",
+        notification_ids,
+    )
+    return cursor.fetchall()
+
+def _publish_notifications(notifications: List[Dict[str, Any]]) -> None:
+    """Pushes notification rows from _fetch_notifications to their owners' open streams."""
+    for notification in notifications:
+        user_id = notification.pop('user_id')
+        notification_bus.publish(user_id, {"event": "notification", "notification": notification})
+
+def create_notification(user_id: int, message: str) -> int | None:
+    """Creates a new notification for a specific user and pushes it to their open notification streams."""
     conn = get_db_connection()
     if conn is None: return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("INSERT INTO notifications (user_id, message) VALUES (%s, %s)", (user_id, message))
+        notification_id = cursor.lastrowid
+        notifications = _fetch_notifications(cursor, [notification_id])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    _publish_notifications(notifications)
+    return notification_id
+
+def get_unread_notifications(user_id: int, before_id: int | None = None, limit: int | None = None, unread_only: bool = False) -> List[Dict[str, Any]]:
+    """Fetches a user's notifications newest first (optionally one page, optionally only unread ones)."""
+    condition, tail, page_params = _keyset(before_id, limit)
+    if unread_only:
+        condition = " AND is_read = FALSE" + condition
+    conn = get_db_connection()
+    if conn is None: return []
+    try:
+        sql = f"SELECT id, message, is_read, created_at FROM notifications WHERE user_id = %s{condition}{tail}"
+        cursor = conn.prepared(sql)
+        cursor.execute(sql, [user_id] + page_params)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+def count_unread_notifications(user_id: int) -> int:
+    """Number of unread notifications; answered from the (user_id, is_read, created_at) index alone."""
+    conn = get_db_connection()
+    if conn is None: return 0
+    try:
+        sql = "SELECT COUNT(*) AS unread FROM notifications WHERE user_id = %s AND is_read = FALSE"
+        cursor = conn.prepared(sql)
+        cursor.execute(sql, (user_id,))
+        row = cursor.fetchone()
+        cursor.fetchall()  # Drain, so the prepared statement can be re-executed
+        return row['unread'] if row else 0
+    finally:
+        conn.close()
+
+def mark_notifications_as_read(user_id: int, notification_ids: List[int] | None = None) -> int:
+    """
+    Marks several of a user's notifications as read in one statement, or all
+    of them when notification_ids is None. Returns how many changed.
+    """
+    if notification_ids is not None and not notification_ids:
+        return 0
+    sql = "UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE"
+    params = [user_id]
+    if notification_ids is not None:
+        sql += f" AND id IN ({', '.join(['%s'] * len(notification_ids))})"
+        params += list(notification_ids)
+    conn = get_db_connection()
+    if conn is None: return 0
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT name FROM persons WHERE id = %s", (person_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+        cursor.execute(sql, params)
+        conn.commit()
+        return cursor.rowcount
     finally:
         cursor.close()
         conn.close()
 
-def mark_person_as_found(person_id: int) -> bool:
-    """Moves a record from 'persons' to 'found_persons' and deletes the original."""
+def mark_notification_as_read(notification_id: int, user_id: int) -> bool:
+    """Marks a specific notification as read for the given user."""
     conn = get_db_connection()
     if conn is None: return False
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT * FROM persons WHERE id = %s", (person_id,))
-        row_to_move = cursor.fetchone()
-        if row_to_move:
-            column_names = [desc[0] for desc in cursor.description]
-            placeholders = ', '.join(['%s'] * len(column_names))
-            sql_insert = f"INSERT INTO found_persons ({', '.join(column_names)}) VALUES ({placeholders})"
-            cursor.execute(sql_insert, row_to_move)
-            cursor.execute("DELETE FROM persons WHERE id = %s", (person_id,))
-            conn.commit()
-            return True
-        return False
+        cursor.execute(
+            "UPDATE notifications SET is_read = TRUE WHERE id = %s AND user_id = %s",
+            (notification_id, user_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0  # Returns True if a row was updated
     finally:
         cursor.close()
         conn.close()
 
-def get_found_cases() -> List[Dict[str, Any]]:
-    """Returns all cases from the 'found_persons' archive table."""
+# ==============================================================================
+# SECTION: Notification Stream Tickets
+# ==============================================================================
+
+def create_stream_ticket(user_id: int, ttl_seconds: int) -> str | None:
+    """
+    Issues a random single-use ticket that opens one notification stream for
+    the user within ttl_seconds. EventSource cannot send an Authorization
+    header, and a redeemed ticket is worthless to anyone who reads it in a log.
+    """
+    ticket = secrets.token_urlsafe(32)
+    now = int(time.time())
     conn = get_db_connection()
-    if conn is None: return []
+    if conn is None: return None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM stream_tickets WHERE expires_at <= %s", (now,))
+        cursor.execute(
+            "INSERT INTO stream_tickets (ticket, user_id, expires_at) VALUES (%s, %s, %s)",
+            (ticket, user_id, now + ttl_seconds)
+        )
+        conn.commit()
+        return ticket
+    finally:
+        cursor.close()
+        conn.close()
+
+def redeem_stream_ticket(ticket: str) -> int | None:
+    """Consumes a stream ticket. Returns its user's id, or None if it is unknown, used or expired."""
+    conn = get_db_connection()
+    if conn is None: return None
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT id, name, age, gender, loc, photo_path FROM found_persons ORDER BY id DESC")
-        return cursor.fetchall()
+        conn.start_transaction()
+        cursor.execute("SELECT user_id, expires_at FROM stream_tickets WHERE ticket = %s FOR UPDATE", (ticket,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        cursor.execute("DELETE FROM stream_tickets WHERE ticket = %s", (ticket,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
+    return row['user_id'] if row['expires_at'] > time.time() else None
 
 # ==============================================================================
-# SECTION: Notification Management
+# SECTION: Background Jobs
 # ==============================================================================
+# Rows of the jobs table are the state of every jobs.JobQueue job, so any API
+# process can report on (and any process's workers can run) any job.
+
+_JOB_COLUMNS = "id, kind, owner_id, job_key, payload, status, attempts, result, error, created_at, updated_at"
 
-def create_notification(user_id: int, message: str) -> None:
-    """Creates a new notification for a specific user."""
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()  # e.g. numpy float32 similarity scores
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _job_row(row: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    if row is not None:
+        row['payload'] = json.loads(row['payload'])
+        row['result'] = json.loads(row['result']) if row['result'] is not None else None
+    return row
+
+def insert_job(job: Dict[str, Any], purge_before: float) -> bool:
+    """
+    Queues a job (a dict with the _JOB_COLUMNS keys) and deletes finished jobs
+    last updated before purge_before. Returns False if the database is unavailable.
+    """
     conn = get_db_connection()
-    if conn is None: return
+    if conn is None: return False
     cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO notifications (user_id, message) VALUES (%s, %s)", (user_id, message))
+        cursor.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < %s", (purge_before,))
+        cursor.execute(
+            "INSERT INTO jobs (id, kind, owner_id, job_key, payload, status, attempts, created_at, updated_at, available_at) "
+            "VALUES (%s, %s, %s, %s, %s, 'queued', 0, %s, %s, %s)",
+            (job['id'], job['kind'], job['owner_id'], job['job_key'], json.dumps(job['payload'], default=_json_default),
+             job['created_at'], job['updated_at'], job['created_at'])
+        )
         conn.commit()
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_job(job_id: str) -> Dict[str, Any] | None:
+    conn = get_db_connection()
+    if conn is None: return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,))
+        return _job_row(cursor.fetchone())
+    finally:
+        cursor.close()
+        conn.close()
+
+def find_job_by_key(kind: str, job_key: str) -> Dict[str, Any] | None:
+    """The newest job of this kind submitted with job_key that hasn't failed, if any."""
+    conn = get_db_connection()
+    if conn is None: return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_key = %s AND kind = %s AND status <> 'failed' "
+            "ORDER BY created_at DESC LIMIT 1",
+            (job_key, kind)
+        )
+        return _job_row(cursor.fetchone())
     finally:
         cursor.close()
         conn.close()
 
-def get_unread_notifications(user_id: int) -> List[Dict[str, Any]]:
-    """Fetches all notifications for a user, which the frontend can filter."""
+def get_pending_jobs(kind: str) -> List[Dict[str, Any]]:
+    """Jobs of this kind that are queued or running."""
     conn = get_db_connection()
     if conn is None: return []
     cursor = conn.cursor(dictionary=True)
     try:
+        cursor.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE kind = %s AND status IN ('queued', 'running')", (kind,))
+        return [_job_row(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+def count_jobs(kind: str, status: str) -> int:
+    conn = get_db_connection()
+    if conn is None: return 0
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM jobs WHERE kind = %s AND status = %s", (kind, status))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+def claim_job(kind: str, now: float, lease_seconds: float) -> Dict[str, Any] | None:
+    """
+    Marks the oldest runnable job of this kind as running under a lease and
+    returns it, with attempts already incremented. Runnable means queued and
+    due, or running under a lease that has expired because its process died.
+    SKIP LOCKED lets several processes claim different jobs at once.
+    """
+    conn = get_db_connection()
+    if conn is None: return None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction()
         cursor.execute(
-            "SELECT id, message, is_read, created_at FROM notifications WHERE user_id = %s ORDER BY created_at DESC",
-            (user_id,)
+            "SELECT id FROM jobs WHERE kind = %s AND ((status = 'queued' AND available_at <= %s) "
+            "OR (status = 'running' AND lease_until < %s)) ORDER BY available_at LIMIT 1 FOR UPDATE SKIP LOCKED",
+            (kind, now, now)
         )
-        return cursor.fetchall()
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        cursor.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = %s, updated_at = %s WHERE id = %s",
+            (now + lease_seconds, now, row['id'])
+        )
+        cursor.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s", (row['id'],))
+        job = _job_row(cursor.fetchone())
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         cursor.close()
         conn.close()
 
-def mark_notification_as_read(notification_id: int, user_id: int) -> bool:
-    """Marks a specific notification as read for the given user."""
+def _update_claimed_job(job_id: str, attempt: int, assignments: str, params: tuple) -> bool:
+    """
+    Updates a running job only if it is still on the given attempt, so a worker
+    whose lease expired (and whose job was claimed again) can't overwrite it.
+    """
     conn = get_db_connection()
     if conn is None: return False
     cursor = conn.cursor()
     try:
         cursor.execute(
-            "UPDATE notifications SET is_read = TRUE WHERE id = %s AND user_id = %s",
-            (notification_id, user_id)
+            f"UPDATE jobs SET {assignments} WHERE id = %s AND attempts = %s AND status = 'running'",
+            params + (job_id, attempt)
         )
         conn.commit()
-        return cursor.rowcount > 0  # Returns True if a row was updated
+        return cursor.rowcount > 0
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+def extend_job_lease(job_id: str, attempt: int, lease_until: float) -> bool:
+    return _update_claimed_job(job_id, attempt, "lease_until = %s", (lease_until,))
+
+def retry_job(job_id: str, attempt: int, error: str, available_at: float, now: float) -> bool:
+    """Puts a running job back in the queue, runnable again from available_at."""
+    return _update_claimed_job(
+        job_id, attempt, "status = 'queued', error = %s, available_at = %s, lease_until = NULL, updated_at = %s",
+        (error, available_at, now)
+    )
+
+def finish_job(job_id: str, attempt: int, status: str, result: Any, error: str | None, now: float) -> bool:
+    """Records a running job as succeeded (with its result) or failed (with its error)."""
+    result_json = json.dumps(result, default=_json_default) if result is not None else None
+    return _update_claimed_job(
+        job_id, attempt, "status = %s, result = %s, error = %s, lease_until = NULL, updated_at = %s",
+        (status, result_json, error, now)
+    )
@@ -0,0 +1,163 @@
+# backend/db_pool.py
+
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class _PoolEntry:
+    """A physical connection plus the prepared statements cached on it."""
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.statements = {}
+        self.last_used = time.monotonic()
+
+
+class PooledConnection:
+    """
+    Connection handed out by ConnectionPool. It behaves like the connection it
+    wraps (mysql.connector, or sqlite_backend's stand-in), except that close()
+    returns it to the pool.
+    """
+
+    def __init__(self, pool: "ConnectionPool", entry: _PoolEntry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        return getattr(self._entry.cnx, name)
+
+    def prepared(self, sql: str):
+        """
+        Returns a dictionary cursor bound to a server-side prepared statement
+        for `sql`, prepared once per physical connection and reused after that.
+        The cursor belongs to the pool, so callers must not close it.
+        """
+        cursor = self._entry.statements.get(sql)
+        if cursor is None:
+            cursor = self._entry.cnx.cursor(prepared=True, dictionary=True)
+            self._entry.statements[sql] = cursor
+            self._pool._count("statements_prepared")
+        else:
+            self._pool._count("statement_reuses")
+        return cursor
+
+    def close(self) -> None:
+        if self._entry is not None:
+            self._pool._release(self._entry)
+            self._entry = None
+
+
+class ConnectionPool:
+    """
+    Size-bounded database connection pool.
+
+    Connections are opened lazily with `connect()` up to `size`; when all are checked out,
+    callers wait up to `timeout` seconds for one to be returned. A connection
+    that has been idle longer than `health_check_after` seconds is pinged
+    before reuse and replaced if it has gone away. `error` is the backend's
+    base exception class.
+    """
+
+    def __init__(self, connect: Callable[[], Any], error: type = Exception, size: int = 10, timeout: float = 5.0,
+                 health_check_after: float = 30.0):
+        self.connect = connect
+        self.error = error
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connections_opened": 0,
+            "health_check_failures": 0,
+            "statements_prepared": 0,
+            "statement_reuses": 0,
+        }
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def _open(self) -> _PoolEntry:
+        try:
+            cnx = self.connect()
+        except self.error:
+            with self._lock:
+                self._created -= 1
+            raise
+        self._count("connections_opened")
+        return _PoolEntry(cnx)
+
+    def _discard(self, entry: _PoolEntry) -> None:
+        with self._lock:
+            self._created -= 1
+        try:
+            entry.cnx.close()
+        except self.error:
+            pass
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        if time.monotonic() - entry.last_used < self.health_check_after:
+            return True
+        try:
+            entry.cnx.ping(reconnect=False)
+            return True
+        except self.error:
+            self._count("health_check_failures")
+            return False
+
+    def get_connection(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                entry = None
+                with self._lock:
+                    can_open = self._created < self.size
+                    if can_open:
+                        self._created += 1
+                if can_open:
+                    entry = self._open()
+                else:
+                    self._count("waits")
+                    remaining = deadline - time.monotonic()
+                    try:
+                        entry = self._idle.get(timeout=max(remaining, 0))
+                    except queue.Empty:
+                        self._count("timeouts")
+                        raise PoolTimeoutError(f"No database connection free after {self.timeout}s")
+            if self._is_healthy(entry):
+                self._count("checkouts")
+                return PooledConnection(self, entry)
+            self._discard(entry)
+
+    def _release(self, entry: _PoolEntry) -> None:
+        try:
+            # End any open transaction (including the implicit one a SELECT starts),
+            # so the next borrower never sees a stale snapshot or half-done writes.
+            if entry.cnx.in_transaction:
+                entry.cnx.rollback()
+        except self.error:
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        self._idle.put(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(size=self.size, open=self._created, idle=self._idle.qsize())
+        stats["in_use"] = stats["open"] - stats["idle"]
+        return stats
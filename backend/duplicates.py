@@ -0,0 +1,77 @@
+# backend/duplicates.py
+
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+import db
+
+# Two active cases this similar are very likely the same person reported twice.
+# Well above the default search strictness (0.4), which favours recall instead.
+DUPLICATE_THRESHOLD = float(os.environ.get("DUPLICATE_THRESHOLD", 0.6))
+MAX_REPORTED_DUPLICATES = 5
+# Rows per tile of the all-pairs scan: a tile's scores take BLOCK_SIZE² floats (16 MB).
+BLOCK_SIZE = 2048
+
+
+def possible_duplicates(embedding: np.ndarray, threshold: float = DUPLICATE_THRESHOLD) -> List[Dict[str, Any]]:
+    """Active cases that look like the same person as `embedding`, most similar first."""
+    matches = db.find_matches(embedding, threshold, top_k=MAX_REPORTED_DUPLICATES)
+    return [{"id": match["id"], "similarity": match["similarity"]} for match in matches]
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]  # Path halving
+        i = parent[i]
+    return i
+
+
+def similar_pairs(embeddings: np.ndarray, threshold: float, block_size: int = BLOCK_SIZE):
+    """
+    Yields (rows_a, rows_b, scores) for every pair of rows with cosine similarity
+    at or above the threshold, each pair once. The similarity matrix is computed
+    one block_size x block_size tile at a time and never held in full.
+    """
+    normed = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    normed = normed.astype(np.float32)
+    n = len(normed)
+    for start_a in range(0, n, block_size):
+        block_a = normed[start_a:start_a + block_size]
+        for start_b in range(start_a, n, block_size):
+            scores = block_a @ normed[start_b:start_b + block_size].T
+            if start_a == start_b:
+                scores = np.triu(scores, k=1)  # Skip self-pairs and mirrored pairs
+            rows_a, rows_b = np.nonzero(scores >= threshold)
+            if len(rows_a):
+                yield rows_a + start_a, rows_b + start_b, scores[rows_a, rows_b]
+
+
+def find_clusters(ids: List[int], embeddings: np.ndarray, threshold: float = DUPLICATE_THRESHOLD,
+                  block_size: int = BLOCK_SIZE) -> List[Dict[str, Any]]:
+    """
+    Groups cases into near-duplicate clusters: any two cases at or above the
+    threshold end up in the same cluster (single linkage, via union-find).
+    Returns clusters of two or more, largest first, as
+    {"ids": [...], "max_similarity": float}.
+    """
+    parent = np.arange(len(ids))
+    best = np.zeros(len(ids), dtype=np.float32)
+    for rows_a, rows_b, scores in similar_pairs(embeddings, threshold, block_size):
+        np.maximum.at(best, rows_a, scores)
+        np.maximum.at(best, rows_b, scores)
+        for a, b in zip(rows_a.tolist(), rows_b.tolist()):
+            root_a, root_b = _find(parent, a), _find(parent, b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    groups: Dict[int, List[int]] = {}
+    for row in np.flatnonzero(best > 0).tolist():
+        groups.setdefault(_find(parent, row), []).append(row)
+    clusters = [
+        {"ids": sorted(ids[row] for row in rows), "max_similarity": round(float(best[rows].max()), 4)}
+        for rows in groups.values()
+    ]
+    clusters.sort(key=lambda c: (-len(c["ids"]), -c["max_similarity"]))
+    return clusters
@@ -0,0 +1,85 @@
+# backend/embedding_codec.py
+
+import os
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+ENCODINGS = ("float32", "float16", "int8")
+
+# Encoding used when writing the persons/found_persons 'embedding' column.
+# Existing rows keep working whatever this is set to: decode() tells the
+# formats apart by their length.
+EMBEDDING_STORAGE = os.environ.get("EMBEDDING_STORAGE", "float32")
+# In-memory search index encoding: float32, float16 (half the memory) or int8 (about a quarter).
+INDEX_ENCODING = os.environ.get("INDEX_ENCODING", "float32")
+
+# A compact index re-ranks its candidates against the stored embeddings, which
+# only restores precision if those are float32; compact storage would just
+# re-score one quantized vector against another.
+if INDEX_ENCODING != "float32" and EMBEDDING_STORAGE != "float32":
+    print(f"EMBEDDING_STORAGE={EMBEDDING_STORAGE} is ignored with INDEX_ENCODING={INDEX_ENCODING}: "
+          "embeddings are stored as float32 so search results can be re-ranked exactly.")
+    EMBEDDING_STORAGE = "float32"
+
+# Blob sizes for a 512-d vector: 2048 B (float32), 1024 B (float16), and
+# 512 int8 codes followed by one float32 scale = 516 B (int8).
+_INT8_BLOB_SIZE = EMBEDDING_DIM + 4
+
+
+def quantize(vectors: np.ndarray, encoding: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts float vectors of shape (n, 512) to the given encoding. Returns
+    (codes, scales); scales are per-vector multipliers, all ones unless int8.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    scales = np.ones(len(vectors), dtype=np.float32)
+    if encoding == "float32":
+        return vectors, scales
+    if encoding == "float16":
+        return vectors.astype(np.float16), scales
+    if encoding == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[..., None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown embedding encoding: {encoding}")
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    vectors = codes.astype(np.float32)
+    if codes.dtype == np.int8:
+        vectors *= scales[:, None]
+    return vectors
+
+
+def encode(embedding: np.ndarray, encoding: str = EMBEDDING_STORAGE) -> bytes:
+    """Serializes one embedding for the database 'embedding' column."""
+    codes, scales = quantize(np.asarray(embedding, dtype=np.float32).reshape(1, EMBEDDING_DIM), encoding)
+    if encoding == "int8":
+        return codes[0].tobytes() + scales[:1].tobytes()
+    return codes[0].tobytes()
+
+
+def decode(blob: bytes) -> np.ndarray:
+    """Turns any stored embedding blob back into a float32 vector."""
+    if len(blob) == EMBEDDING_DIM * 4:
+        return np.frombuffer(blob, dtype=np.float32)
+    if len(blob) == EMBEDDING_DIM * 2:
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+    if len(blob) == _INT8_BLOB_SIZE:
+        codes = np.frombuffer(blob, dtype=np.int8, count=EMBEDDING_DIM)
+        scale = np.frombuffer(blob, dtype=np.float32, offset=EMBEDDING_DIM)[0]
+        return codes.astype(np.float32) * scale
+    raise ValueError(f"Unrecognised embedding blob of {len(blob)} bytes")
+
+
+def decode_many(blobs: list[bytes]) -> np.ndarray:
+    """Decodes a list of blobs into an (n, 512) float32 matrix."""
+    if blobs and all(len(blob) == EMBEDDING_DIM * 4 for blob in blobs):
+        # Fast path for the common all-float32 case
+        return np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    matrix = np.empty((len(blobs), EMBEDDING_DIM), dtype=np.float32)
+    for i, blob in enumerate(blobs):
+        matrix[i] = decode(blob)
+    return matrix
@@ -1,24 +1,130 @@
+import os
+import threading
 from io import BytesIO
 
 import insightface
 import numpy as np
 from insightface.app import FaceAnalysis
-from PIL import Image
+from insightface.utils import face_align
+from PIL import Image, ImageOps
 
-# Load model once
-app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-app.prepare(ctx_id=0)
+MODEL_NAME = "buffalo_l"
+# get_embedding only needs the detector and the recognition model; the landmark
+# and gender/age models in buffalo_l are never loaded.
+MODEL_MODULES = ["detection", "recognition"]
+
+# Uploads are downscaled so their longest side is at most this many pixels before
+# detection; the detector letterboxes everything to 640x640 anyway.
+MAX_IMAGE_SIDE = int(os.environ.get("MAX_IMAGE_SIDE", 640))
+
+_app: FaceAnalysis | None = None
+_app_lock = threading.Lock()
+
+def get_app() -> FaceAnalysis:
+    """Loads the models on first use, so importing this module stays cheap."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                app = FaceAnalysis(name=MODEL_NAME, allowed_modules=MODEL_MODULES, providers=["CPUExecutionProvider"])
+                app.prepare(ctx_id=0)
+                _app = app
+    return _app
+
+def is_loaded() -> bool:
+    return _app is not None
+
+def warm_up() -> None:
+    """Loads the models and runs one detection so the first real request isn't slowed by setup."""
+    get_app().get(np.zeros((640, 640, 3), dtype=np.uint8))
+
+def load_image(img_bytes: bytes, max_side: int = MAX_IMAGE_SIDE) -> np.ndarray:
+    """
+    Decodes an upload into an RGB array no larger than max_side. JPEGs are
+    decoded at reduced size by the decoder itself (draft mode), which is much
+    cheaper than decoding a 12 MP photo and resizing it afterwards.
+    """
+    img = Image.open(BytesIO(img_bytes))
+    if img.format == "JPEG":
+        img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)  # Phone photos are often stored sideways
+    img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return np.asarray(img)
+
+# EXIF orientations 5-8 rotate the image by 90 degrees, swapping width and height
+EXIF_ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def upright_size(img_bytes: bytes) -> tuple[int, int]:
+    """(width, height) of an image after EXIF orientation, read from the header without decoding."""
+    img = Image.open(BytesIO(img_bytes))
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
 
 def get_embedding(img_bytes: bytes) -> np.ndarray:
     try:
-        img = Image.open(BytesIO(img_bytes)).convert("RGB")
-        img_np = np.array(img)
-        faces = app.get(img_np)
+        img_np = load_image(img_bytes)
+        faces = get_app().get(img_np)
         if not faces:
             raise ValueError("❌ No face detected.")
         return faces[0].embedding
     except Exception as e:
         raise ValueError(f"Face processing failed: {e}")
 
+def get_faces(img_bytes: bytes) -> list[dict]:
+    """
+    Detects every face in an image, e.g. a group or crowd photo. Returns one
+    dict per face with its bounding box [x1, y1, x2, y2] in the uploaded
+    image's pixel coordinates, the detection score and the embedding.
+    """
+    try:
+        original_size = upright_size(img_bytes)
+        img_np = load_image(img_bytes)
+        faces = get_app().get(img_np)
+    except Exception as e:
+        raise ValueError(f"Face processing failed: {e}")
+    if not faces:
+        raise ValueError("❌ No face detected.")
+    # Boxes come back in the downscaled image's coordinates
+    scale = max(original_size) / max(img_np.shape[:2])
+    return [
+        {
+            "bbox": [round(float(v) * scale, 1) for v in face.bbox],
+            "det_score": float(face.det_score),
+            "embedding": face.embedding,
+        }
+        for face in faces
+    ]
+
+def get_embeddings_batch(images: list[bytes]) -> list[np.ndarray | ValueError]:
+    """
+    Embeds several images at once. Detection still runs per image (the detector
+    takes one letterboxed image per call), but all aligned face crops go through
+    the recognition model as a single batch. Returns, per image, either the
+    embedding of its first detected face or the ValueError get_embedding would raise.
+    """
+    app = get_app()
+    rec_model = app.models["recognition"]
+    results: list[np.ndarray | ValueError | None] = [None] * len(images)
+    crops, crop_owners = [], []
+    for i, img_bytes in enumerate(images):
+        try:
+            img_np = load_image(img_bytes)
+            bboxes, kpss = app.det_model.detect(img_np, max_num=0, metric="default")
+            if bboxes.shape[0] == 0:
+                raise ValueError("❌ No face detected.")
+            crops.append(face_align.norm_crop(img_np, landmark=kpss[0], image_size=rec_model.input_size[0]))
+            crop_owners.append(i)
+        except Exception as e:
+            results[i] = ValueError(f"Face processing failed: {e}")
+    if crops:
+        embeddings = rec_model.get_feat(crops)
+        for owner, embedding in zip(crop_owners, embeddings):
+            results[owner] = embedding
+    return results
+
 def cosine(v1: np.ndarray, v2: np.ndarray) -> float:
     return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
@@ -0,0 +1,38 @@
+# backend/find_duplicates.py
+import argparse
+import csv
+import time
+
+import db
+import duplicates
+
+def main():
+    """A command-line script to find active cases that are probably the same person reported more than once."""
+    parser = argparse.ArgumentParser(description="Find near-duplicate missing person cases.")
+    parser.add_argument("--threshold", type=float, default=duplicates.DUPLICATE_THRESHOLD, help="Minimum similarity to treat two cases as duplicates")
+    parser.add_argument("--output", default="duplicates.csv", help="CSV report with one row per case in a duplicate cluster")
+    parser.add_argument("--block-size", type=int, default=duplicates.BLOCK_SIZE)
+    args = parser.parse_args()
+
+    print("--- Finding duplicate cases ---")
+    ids, embeddings = db.get_case_embeddings()
+    print(f"Comparing {len(ids)} active cases (threshold {args.threshold})...")
+    started = time.perf_counter()
+    clusters = duplicates.find_clusters(ids, embeddings, args.threshold, args.block_size)
+    print(f"Scan took {time.perf_counter() - started:.1f}s.")
+
+    cases = db.get_cases_by_ids([person_id for cluster in clusters for person_id in cluster["ids"]])
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["cluster", "max_similarity", "id", "name", "age", "gender", "loc"])
+        for number, cluster in enumerate(clusters, start=1):
+            for person_id in cluster["ids"]:
+                case = cases.get(person_id, {})
+                writer.writerow([number, cluster["max_similarity"], person_id,
+                                 case.get("name"), case.get("age"), case.get("gender"), case.get("loc")])
+
+    duplicate_cases = sum(len(cluster["ids"]) for cluster in clusters)
+    print(f"✅ Found {len(clusters)} clusters covering {duplicate_cases} cases. Report: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# backend/generate_thumbnails.py
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import photo_store
+import thumbnails
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
+
+def main():
+    """A command-line script to create thumbnails for photos registered before thumbnails existed."""
+    parser = argparse.ArgumentParser(description="Backfill case photo thumbnails.")
+    parser.add_argument("--force", action="store_true", help="Regenerate thumbnails that already exist")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Photos processed in parallel")
+    args = parser.parse_args()
+
+    photo_paths = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(photo_store.PHOTOS_DIR)
+        for name in names
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    ]
+    print(f"--- Generating thumbnails for {len(photo_paths)} photos ---")
+
+    def process(photo_path):
+        try:
+            thumbnails.generate(photo_path, overwrite=args.force)
+            return None
+        except Exception as e:
+            return f"{photo_path}: {e}"
+
+    # Pillow releases the GIL while decoding and encoding, so threads scale across cores
+    failures = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for done, error in enumerate(executor.map(process, photo_paths), start=1):
+            if error:
+                failures.append(error)
+            print(f"  {done}/{len(photo_paths)}", end="\r")
+    print()
+    for error in failures:
+        print(f"❌ {error}")
+    print(f"✅ Done: {len(photo_paths) - len(failures)} photos have thumbnails, {len(failures)} failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# backend/identity_cache.py
+
+import os
+import threading
+
+from cachetools import TTLCache
+
+# --- Identity Cache Configuration ---
+# Entries expire after IDENTITY_CACHE_TTL seconds, which also bounds how long
+# another worker process can keep trusting an identity after it changes.
+IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", 10000))
+IDENTITY_CACHE_TTL = float(os.environ.get("IDENTITY_CACHE_TTL", 300))
+
+_cache = TTLCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get(username: str) -> int | None:
+    """Returns the cached user id for a username, or None on a miss."""
+    with _lock:
+        user_id = _cache.get(username)
+        _stats["hits" if user_id is not None else "misses"] += 1
+        return user_id
+
+def put(username: str, user_id: int) -> None:
+    with _lock:
+        _cache[username] = user_id
+
+def invalidate(username: str | None = None) -> None:
+    """Drops one username from the cache, or everything when no username is given."""
+    with _lock:
+        if username is None:
+            _cache.clear()
+        else:
+            _cache.pop(username, None)
+        _stats["invalidations"] += 1
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, size=len(_cache), maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
@@ -0,0 +1,46 @@
+# backend/import_cases.py
+import argparse
+import os
+
+import bulk_import
+import db
+import inference
+
+def main():
+    """A command-line script to bulk-import cases from a CSV manifest and a folder or ZIP of photos."""
+    parser = argparse.ArgumentParser(description="Bulk-import missing person cases.")
+    parser.add_argument("manifest", help="CSV file with columns: name, age, gender, loc, photo")
+    parser.add_argument("photos", help="Folder or ZIP archive containing the photos named in the manifest")
+    parser.add_argument("--owner", required=True, help="Username the imported cases are registered under")
+    parser.add_argument("--report", help="Report CSV (default: <manifest>.report.csv). Re-run with the same report to resume.")
+    parser.add_argument("--batch-size", type=int, default=bulk_import.DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    user_id = db.get_user_id(args.owner)
+    if user_id is None:
+        print(f"Error: User '{args.owner}' does not exist.")
+        return
+
+    report_path = args.report or f"{os.path.splitext(args.manifest)[0]}.report.csv"
+    print(f"--- Importing cases from {args.manifest} ---")
+    print(f"Report: {report_path}")
+
+    inference.start()
+    try:
+        summary = bulk_import.import_cases(
+            args.manifest, args.photos, user_id, report_path,
+            batch_size=args.batch_size,
+            on_progress=lambda s: print(f"  imported {s['imported']}, failed {s['failed']}", end="\r"),
+        )
+        print()
+        print(f"✅ Imported {summary['imported']} cases ({summary['failed']} failed, {summary['skipped']} already done).")
+        if summary["failed"]:
+            print(f"See {report_path} for the rows that failed; fix them and re-run to retry.")
+    except (ValueError, OSError) as e:
+        print(f"❌ Import failed. Error: {e}")
+    finally:
+        inference.shutdown()
+        db.save_person_index()
+
+if __name__ == "__main__":
+    main()
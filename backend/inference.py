@@ -0,0 +1,268 @@
+# backend/inference.py
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from cachetools import TTLCache
+
+# --- Inference Pool Configuration ---
+# Each worker process loads its own copy of the buffalo_l models (a few hundred MB),
+# so size the pool by available memory as well as cores.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 1))
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", 30))
+# Micro-batching: concurrent requests are grouped into one worker job of up to
+# BATCH_MAX_SIZE images, waiting at most BATCH_MAX_WAIT_MS for the batch to fill.
+# BATCH_MAX_SIZE=1 disables batching.
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 5))
+
+# Query-embedding cache, keyed by a hash of the image bytes, so re-running the
+# same photo (e.g. with a different strictness) skips inference entirely.
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 1024))
+EMBEDDING_CACHE_TTL = float(os.environ.get("EMBEDDING_CACHE_TTL", 3600))
+
+_executor: ProcessPoolExecutor | None = None
+_workers = 0
+# Shared with the pool: each worker adds one once its models are loaded.
+_ready_workers = None
+_batcher: "MicroBatcher | None" = None
+_embedding_cache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+class InferenceTimeoutError(Exception):
+    """Raised when a face-inference job does not finish within its timeout."""
+
+
+# ==============================================================================
+# SECTION: Worker-side functions (run inside the pool processes)
+# ==============================================================================
+
+def _init_worker(ready_workers) -> None:
+    """Loads and warms up the models once per worker process, then counts itself as ready."""
+    import face_utils
+    face_utils.warm_up()
+    with ready_workers.get_lock():
+        ready_workers.value += 1
+
+def _ping() -> int:
+    return os.getpid()
+
+def _get_embedding(image_bytes: bytes) -> np.ndarray:
+    import face_utils
+    return face_utils.get_embedding(image_bytes)
+
+def _get_embeddings_batch(images: list[bytes]) -> list:
+    import face_utils
+    return face_utils.get_embeddings_batch(images)
+
+def _get_faces(image_bytes: bytes) -> list[dict]:
+    import face_utils
+    return face_utils.get_faces(image_bytes)
+
+def _extract_video_tracks(path: str, sample_fps: float) -> dict:
+    import video_search
+    return video_search.extract_tracks(path, sample_fps)
+
+# ==============================================================================
+# SECTION: Pool management (called from the API process)
+# ==============================================================================
+
+def start(workers: int = INFERENCE_WORKERS) -> ProcessPoolExecutor:
+    """
+    Creates the worker pool and spawns every worker so models load before
+    traffic arrives. Returns immediately; is_ready() reports when they have.
+    """
+    global _executor, _workers, _ready_workers
+    if _executor is None:
+        # 'spawn' avoids forking a process that may already hold ONNX Runtime threads
+        context = multiprocessing.get_context("spawn")
+        _ready_workers = context.Value("i", 0)
+        _workers = workers
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(_ready_workers,),
+        )
+        # The pool starts workers on demand; one job each, queued at once, starts them all
+        for _ in range(workers):
+            _executor.submit(_ping)
+    return _executor
+
+def is_ready() -> bool:
+    """True once every worker in the pool has finished loading its models."""
+    return _executor is not None and _ready_workers is not None and _ready_workers.value >= _workers
+
+def _stop_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def shutdown() -> None:
+    global _batcher
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
+    _stop_executor()
+
+def get_executor() -> ProcessPoolExecutor:
+    return _executor or start()
+
+async def run(func, *args, timeout: float | None = None):
+    """Runs a picklable function in the pool and awaits its result without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        future = loop.run_in_executor(get_executor(), func, *args)
+        return await asyncio.wait_for(future, timeout or INFERENCE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise InferenceTimeoutError("Face processing timed out. Please try again.")
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for the next request.
+        _stop_executor()
+        raise
+
+# ==============================================================================
+# SECTION: Micro-batching
+# ==============================================================================
+
+class MicroBatcher:
+    """
+    Collects images submitted by concurrent requests for up to `max_wait_ms`
+    (or until `max_batch_size` are waiting), embeds them in one worker job,
+    and resolves each caller's future with its own result.
+    """
+
+    def __init__(self, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+        self.batches = 0
+        self.items = 0
+        self.total_latency = 0.0
+
+    async def submit(self, image_bytes: bytes, timeout: float | None = None) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        await self._queue.put((image_bytes, future))
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or INFERENCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise InferenceTimeoutError("Face processing timed out. Please try again.")
+        finally:
+            self.total_latency += time.perf_counter() - started
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without awaiting, so the next batch fills while this one runs.
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: list) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await run(_get_embeddings_batch, [image for image, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def close(self) -> None:
+        self._collector.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "mean_latency_ms": round(1000 * self.total_latency / self.items, 2) if self.items else 0.0,
+        }
+
+def get_batcher() -> MicroBatcher:
+    """Returns the process-wide batcher, creating it on the running event loop."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher()
+    return _batcher
+
+# ==============================================================================
+# SECTION: Query-embedding cache
+# ==============================================================================
+
+def content_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def cache_stats() -> dict:
+    return dict(_cache_stats, size=len(_embedding_cache), maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+
+async def get_embedding(image_bytes: bytes, timeout: float | None = None) -> np.ndarray:
+    """
+    Async counterpart of face_utils.get_embedding; raises ValueError if no face is found.
+    Identical image bytes seen within the cache TTL are answered from the cache.
+    """
+    key = content_hash(image_bytes)
+    cached = _embedding_cache.get(key)
+    if cached is not None:
+        _cache_stats["hits"] += 1
+        return cached
+    _cache_stats["misses"] += 1
+    if BATCH_MAX_SIZE > 1:
+        embedding = await get_batcher().submit(image_bytes, timeout=timeout)
+    else:
+        embedding = await run(_get_embedding, image_bytes, timeout=timeout)
+    _embedding_cache[key] = embedding
+    return embedding
+
+async def get_faces(image_bytes: bytes, timeout: float | None = None) -> list[dict]:
+    """Async counterpart of face_utils.get_faces: every face in the image, with bounding boxes."""
+    return await run(_get_faces, image_bytes, timeout=timeout)
+
+def get_embeddings_batch(images: list[bytes], chunk_size: int = 8, timeout: float | None = None) -> list:
+    """
+    Blocking counterpart of get_embedding for scripts and worker threads (e.g.
+    bulk imports): embeds images across the pool, chunk_size per job with the
+    jobs running in parallel. Returns an embedding or the exception raised
+    (ValueError when no face is found) for each image, in order.
+    """
+    executor = get_executor()
+    starts = range(0, len(images), chunk_size)
+    futures = [executor.submit(_get_embeddings_batch, images[start:start + chunk_size]) for start in starts]
+    results = []
+    for future, start in zip(futures, starts):
+        count = len(images[start:start + chunk_size])
+        try:
+            results.extend(future.result(timeout=(timeout or INFERENCE_TIMEOUT) * count))
+        except BrokenProcessPool as e:
+            _stop_executor()  # As in run(): the next call starts a fresh pool
+            results.extend([e] * count)
+        except Exception as e:
+            results.extend([e] * count)
+    return results
+
+async def extract_video_tracks(path: str, sample_fps: float, timeout: float | None = None) -> dict:
+    """Async counterpart of video_search.extract_tracks, run in an inference worker."""
+    return await run(_extract_video_tracks, path, sample_fps, timeout=timeout)
@@ -0,0 +1,218 @@
+# backend/jobs.py
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+import db
+
+# --- Job Queue Configuration ---
+# Jobs waiting beyond this many are refused (HTTP 503) rather than queued
+# without bound; clients should retry later.
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 256))
+# Concurrent jobs per API process. Inference is the bottleneck, so roughly one per inference worker.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", os.cpu_count() or 1))
+# Attempts per job for transient failures (timeouts, database hiccups, a worker process dying).
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_DELAY = float(os.environ.get("JOB_RETRY_DELAY", 2))
+# Finished jobs stay queryable this long.
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 3600))
+# A running job is renewed this often; if its process dies, another claims it once the lease runs out.
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 60))
+# Idle workers look for jobs submitted by other API processes this often.
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix (e.g. no face in the photo)."""
+
+
+class Job:
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.payload = row["payload"]
+        self.owner_id = row["owner_id"]
+        self.status = row["status"]  # queued -> running -> succeeded | failed (running <-> queued on retry)
+        self.attempts = row["attempts"]
+        self.result: Any = row["result"]
+        self.error: str | None = row["error"]
+        self.created_at = row["created_at"]
+        self.updated_at = row["updated_at"]
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of background jobs kept in the jobs table, so every API
+    process sees every job's status and queued jobs survive a restart. Each
+    process runs up to `workers` jobs at a time with `handler(payload)`,
+    claiming them from the table under a lease that is renewed while the job
+    runs; a job whose process died is claimed again once its lease expires.
+
+    A handler raising PermanentJobError (or ValueError) fails the job at once;
+    any other exception is retried up to `max_attempts` times with a growing
+    delay. Jobs submitted with a `key` already held by a live job return that
+    job instead, so a client retrying a timed-out request doesn't repeat the work.
+    """
+
+    def __init__(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_SIZE, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 on_failure: Callable[[Dict[str, Any]], None] | None = None):
+        self.kind = kind
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.on_failure = on_failure
+        self._poller: asyncio.Task | None = None
+        self._running: set = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._wake: asyncio.Event | None = None
+        self.stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "succeeded": 0, "failed": 0, "retries": 0}
+
+    def start(self) -> None:
+        """Starts claiming and running jobs; must be called from the running event loop."""
+        if self._poller is None:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._wake = asyncio.Event()
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stops this process's workers. Jobs they were running are picked up again after their lease expires."""
+        tasks = [self._poller, *self._running] if self._poller is not None else []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poller = None
+        self._running = set()
+
+    async def submit(self, payload: Dict[str, Any], owner_id: int, key: str | None = None) -> Job:
+        """
+        Queues a job; raises QueueFullError at capacity and ConnectionError if
+        the database is unavailable. The payload must be JSON-serializable.
+        """
+        job_key = hashlib.sha256(f"{self.kind}:{key}".encode()).hexdigest() if key is not None else None
+        if job_key is not None:
+            existing = await asyncio.to_thread(db.find_job_by_key, self.kind, job_key)
+            if existing is not None:
+                self.stats["deduplicated"] += 1
+                return Job(existing)
+        self.start()
+        if await asyncio.to_thread(db.count_jobs, self.kind, "queued") >= self.max_size:
+            self.stats["rejected"] += 1
+            raise QueueFullError(f"Too many {self.kind} jobs are waiting. Please retry shortly.")
+        now = time.time()
+        row = {
+            "id": uuid.uuid4().hex, "kind": self.kind, "owner_id": owner_id, "job_key": job_key, "payload": payload,
+            "status": "queued", "attempts": 0, "result": None, "error": None, "created_at": now, "updated_at": now,
+        }
+        if not await asyncio.to_thread(db.insert_job, row, now - JOB_RESULT_TTL):
+            raise ConnectionError("Database unavailable")
+        self.stats["submitted"] += 1
+        self._wake.set()
+        return Job(row)
+
+    async def get(self, job_id: str) -> Job | None:
+        row = await asyncio.to_thread(db.get_job, job_id)
+        if row is None or row["kind"] != self.kind:
+            return None
+        return Job(row)
+
+    def pending(self) -> list:
+        """Jobs that are queued or running, in any process. Blocks on the database."""
+        return [Job(row) for row in db.get_pending_jobs(self.kind)]
+
+    async def _poll(self) -> None:
+        while True:
+            await self._slots.acquire()
+            self._wake.clear()
+            try:
+                row = await asyncio.to_thread(db.claim_job, self.kind, time.time(), JOB_LEASE_SECONDS)
+            except Exception as e:
+                print(f"Claiming a {self.kind} job failed: {e}")
+                row = None
+            if row is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.get_running_loop().create_task(self._run(Job(row)))
+            self._running.add(task)
+            task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Recording the outcome of a {self.kind} job failed: {task.exception()}")
+
+    async def _renew_lease(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            await asyncio.to_thread(db.extend_job_lease, job.id, job.attempts, time.time() + JOB_LEASE_SECONDS)
+
+    async def _run(self, job: Job) -> None:
+        if job.attempts > self.max_attempts:
+            # Claimed again after the processes running it died max_attempts times
+            await self._fail(job, job.error or "The worker running this job stopped.")
+            return
+        lease = asyncio.get_running_loop().create_task(self._renew_lease(job))
+        retry = False
+        try:
+            result = await self.handler(job.payload)
+        except (PermanentJobError, ValueError) as e:
+            error = str(e)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            retry = job.attempts < self.max_attempts
+        else:
+            await asyncio.to_thread(db.finish_job, job.id, job.attempts, "succeeded", result, None, time.time())
+            self.stats["succeeded"] += 1
+            return
+        finally:
+            lease.cancel()
+        if retry:
+            self.stats["retries"] += 1
+            now = time.time()
+            await asyncio.to_thread(db.retry_job, job.id, job.attempts, error, now + JOB_RETRY_DELAY * 2 ** (job.attempts - 1), now)
+            return
+        await self._fail(job, error)
+
+    async def _fail(self, job: Job, error: str) -> None:
+        if not await asyncio.to_thread(db.finish_job, job.id, job.attempts, "failed", None, error, time.time()):
+            return  # Claimed again by another worker since; that one owns the outcome
+        self.stats["failed"] += 1
+        if self.on_failure is not None:
+            try:
+                await asyncio.to_thread(self.on_failure, job.payload)
+            except Exception as e:
+                print(f"Cleanup after failed {self.kind} job {job.id} failed: {e}")
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """Counters for this process plus the queue length across all processes. Blocks on the database."""
+        return dict(self.stats, queued=db.count_jobs(self.kind, "queued"), running=len(self._running), max_size=self.max_size)
@@ -0,0 +1,62 @@
+# backend/migrate_photos.py
+import argparse
+import os
+
+import db
+import photo_store
+import thumbnails
+
+UPDATE_BATCH_SIZE = 500
+
+def main():
+    """A command-line script to move existing case photos into the content-addressed photo store."""
+    parser = argparse.ArgumentParser(description="Migrate photos/<uuid>.<ext> files to photos/ab/cd/<sha256>.<ext>.")
+    parser.add_argument("--delete-originals", action="store_true", help="Remove the old files once every case points at the new ones")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be done")
+    args = parser.parse_args()
+
+    print("--- Migrating photos to the content-addressed store ---")
+    originals, missing, migrated, duplicates = set(), [], 0, 0
+    for table in ("persons", "found_persons"):
+        moves = []
+        for case_id, photo_path in db.get_photo_paths(table):
+            try:
+                with open(photo_path, "rb") as f:
+                    image_bytes = f.read()
+            except OSError:
+                missing.append(f"{table} #{case_id}: {photo_path}")
+                continue
+            new_path = photo_store.locate(image_bytes, photo_path)
+            if new_path == photo_path:
+                continue  # Already migrated
+            if not args.dry_run:
+                _, created = photo_store.save(image_bytes, photo_path)
+                duplicates += not created
+                thumbnails.generate_quietly(new_path, image_bytes)
+            moves.append((new_path, case_id))
+            originals.add(photo_path)
+        updated = 0
+        for start in range(0, len(moves), UPDATE_BATCH_SIZE):
+            if not args.dry_run:
+                updated += db.update_photo_paths(table, moves[start:start + UPDATE_BATCH_SIZE])
+        migrated += len(moves) if args.dry_run else updated
+        print(f"  {table}: {len(moves) if args.dry_run else updated} photos {'to migrate' if args.dry_run else 'migrated'}")
+
+    if args.delete_originals and not args.dry_run:
+        # Only files no case points at any more: a row whose update didn't land still needs its original
+        still_used = db.get_referenced_photo_paths(sorted(originals))
+        for photo_path in originals - still_used:
+            for path in [photo_path, *thumbnails.thumbnail_paths(photo_path).values()]:
+                if os.path.exists(path):
+                    os.remove(path)
+        print(f"  Removed {len(originals - still_used)} original files.")
+        if still_used:
+            print(f"  Kept {len(still_used)} original files that cases still point at; run the migration again.")
+
+    for entry in missing:
+        print(f"❌ Missing photo file for {entry}")
+    print(f"✅ {migrated} cases {'would be' if args.dry_run else 'were'} moved to the photo store "
+          f"({duplicates} shared an identical photo with another case).")
+
+if __name__ == "__main__":
+    main()
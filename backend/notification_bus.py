@@ -0,0 +1,57 @@
+# backend/notification_bus.py
+
+import asyncio
+import threading
+from typing import Any, Dict
+
+# Events buffered per open stream; a client that falls this far behind misses
+# events but still gets the correct unread count on the next keep-alive.
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_subscribers: Dict[int, set] = {}  # user_id -> {(loop, queue)}
+_lock = threading.Lock()
+
+
+def subscribe(user_id: int) -> tuple:
+    """Registers a stream for a user; call from the event loop. Pass the result to unsubscribe()."""
+    subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+    with _lock:
+        _subscribers.setdefault(user_id, set()).add(subscription)
+    return subscription
+
+
+def unsubscribe(user_id: int, subscription: tuple) -> None:
+    with _lock:
+        streams = _subscribers.get(user_id)
+        if streams is not None:
+            streams.discard(subscription)
+            if not streams:
+                del _subscribers[user_id]
+
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+def publish(user_id: int, event: Dict[str, Any]) -> None:
+    """
+    Delivers an event to every open stream of a user. Safe to call from any
+    thread (db functions run in the threadpool and background workers).
+    Streams only exist in this process, so other API worker processes pick
+    the change up through their periodic unread-count refresh instead.
+    """
+    with _lock:
+        streams = list(_subscribers.get(user_id, ()))
+    for loop, queue in streams:
+        try:
+            loop.call_soon_threadsafe(_offer, queue, event)
+        except RuntimeError:
+            pass  # The stream's loop has closed
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return {"users": len(_subscribers), "streams": sum(len(s) for s in _subscribers.values())}
@@ -0,0 +1,74 @@
+# backend/orphan_photos.py
+
+import os
+import time
+from typing import Callable, Iterator, Set
+
+import db
+import photo_store
+import thumbnails
+
+# --- Orphan Photo Sweep Configuration ---
+# Stored photos that no case or pending job refers to (e.g. the upload of a
+# registration that failed) are removed by a periodic sweep, not by the job
+# that failed: identical uploads share one file, and only a look at every
+# reference can tell whether another registration still needs it.
+ORPHAN_SWEEP_SECONDS = float(os.environ.get("ORPHAN_SWEEP_SECONDS", 6 * 3600))
+# Photos written or re-uploaded more recently than this are never swept, which
+# covers a registration between storing its photo and queueing its job.
+ORPHAN_GRACE_SECONDS = float(os.environ.get("ORPHAN_GRACE_SECONDS", 3600))
+CHECK_BATCH_SIZE = 256
+
+
+def _stale_photos(cutoff: float) -> Iterator[str]:
+    """Content-addressed photos (photos/ab/cd/abcd…) last modified before cutoff."""
+    for root, _, files in os.walk(photo_store.PHOTOS_DIR):
+        shard = os.path.relpath(root, photo_store.PHOTOS_DIR).replace("\\", "/")
+        if shard.count("/") != 1:
+            continue  # Not a shard directory: e.g. originals left by migrate_photos.py
+        prefix = shard.replace("/", "")
+        for name in files:
+            if not name.startswith(prefix) or name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    yield path
+            except FileNotFoundError:
+                continue
+
+
+def sweep(pending_photo_paths: Callable[[], Set[str]], grace_seconds: float = ORPHAN_GRACE_SECONDS) -> int:
+    """
+    Deletes stored photos, and their thumbnails, that are older than
+    grace_seconds and that no active case, found case or pending job refers
+    to. Returns how many were deleted.
+
+    The checks run in a fixed order: age, then pending jobs, then cases, then
+    age again just before deleting. photo_store.save refreshes the age of a
+    photo it reuses, so an identical upload racing the sweep is either seen as
+    a pending job or makes its photo too young to delete.
+    """
+    cutoff = time.time() - grace_seconds
+    candidates = list(_stale_photos(cutoff))
+    if not candidates:
+        return 0
+    in_use = pending_photo_paths()
+    removed = 0
+    for start in range(0, len(candidates), CHECK_BATCH_SIZE):
+        chunk = [path for path in candidates[start:start + CHECK_BATCH_SIZE] if path not in in_use]
+        if not chunk:
+            continue
+        referenced = db.get_referenced_photo_paths(chunk)
+        for path in chunk:
+            if path in referenced:
+                continue
+            try:
+                if os.stat(path).st_mtime >= cutoff:
+                    continue  # Uploaded again since it was listed
+            except FileNotFoundError:
+                continue
+            photo_store.delete(path)
+            thumbnails.delete(path)
+            removed += 1
+    return removed
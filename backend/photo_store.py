@@ -0,0 +1,80 @@
+# backend/photo_store.py
+
+import hashlib
+import os
+import uuid
+from io import BytesIO
+
+from PIL import Image
+
+PHOTOS_DIR = "photos"
+# Extensions by decoded image format, so the same bytes always get the same
+# name whatever the uploaded file was called.
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif", "BMP": ".bmp", "TIFF": ".tif"}
+
+
+def content_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _extension(image_bytes: bytes, fallback: str) -> str:
+    try:
+        image_format = Image.open(BytesIO(image_bytes)).format  # Reads the header only
+    except Exception:
+        image_format = None
+    return FORMAT_EXTENSIONS.get(image_format, (fallback or ".bin").lower())
+
+
+def path_for(digest: str, extension: str) -> str:
+    """
+    photos/ab/cd/abcd…<ext>: two levels of 256-way sharding keep every
+    directory small even with millions of photos.
+    """
+    return os.path.join(PHOTOS_DIR, digest[:2], digest[2:4], f"{digest}{extension}")
+
+
+def locate(image_bytes: bytes, filename: str = "") -> str:
+    """Where these bytes are (or would be) stored; `filename` only supplies a fallback extension."""
+    return path_for(content_hash(image_bytes), _extension(image_bytes, os.path.splitext(filename)[1]))
+
+
+def save(image_bytes: bytes, filename: str = "") -> tuple[str, bool]:
+    """
+    Stores a photo under its content hash. Returns (photo_path, created);
+    created is False when an identical photo was already stored, in which
+    case nothing is written but its modification time is refreshed, which
+    keeps it from the orphan sweep (see orphan_photos.py).
+    """
+    photo_path = locate(image_bytes, filename)
+    try:
+        os.utime(photo_path)
+        return photo_path, False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(photo_path), exist_ok=True)
+    # Write under a unique temporary name, then rename: concurrent uploads of the
+    # same photo can't interleave, and a half-written file is never served.
+    tmp_path = f"{photo_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image_bytes)
+    os.replace(tmp_path, photo_path)
+    return photo_path, True
+
+
+def url_path(photo_path: str) -> str:
+    """The photo's path below the /photos mount, for building its URL."""
+    # Paths written on Windows use backslashes
+    return os.path.relpath(photo_path.replace("\\", "/"), PHOTOS_DIR).replace("\\", "/")
+
+
+def read(photo_path: str) -> bytes:
+    with open(photo_path, "rb") as f:
+        return f.read()
+
+
+def delete(photo_path: str) -> None:
+    """Removes a stored photo; only safe once no case refers to it."""
+    try:
+        os.remove(photo_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,441 @@
+# backend/search_index.py
+
+import os
+import threading
+import uuid
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from embedding_codec import EMBEDDING_DIM, INDEX_ENCODING, dequantize, quantize
+
+# --- Approximate search (IVF) settings ---
+# Below MIN_TRAIN_SIZE cases a brute-force scan is already fast, so the index stays exact.
+MIN_TRAIN_SIZE = int(os.environ.get("ANN_MIN_TRAIN_SIZE", 10000))
+# Number of inverted lists probed per query; higher means better recall, slower search.
+DEFAULT_NPROBE = int(os.environ.get("ANN_NPROBE", 16))
+PERSON_INDEX_PATH = os.environ.get("PERSON_INDEX_PATH", os.path.join("index", "persons.npz"))
+FOUND_INDEX_PATH = os.environ.get("FOUND_INDEX_PATH", os.path.join("index", "found_persons.npz"))
+# How far a compact score can sit below the exact one; candidates are kept with
+# this much slack and re-ranked against the stored embeddings afterwards.
+SCORE_MARGIN = {"float32": 0.0, "float16": 0.002, "int8": 0.02}
+SCORE_CHUNK = 8192
+
+
+class EmbeddingIndex:
+    """
+    Process-resident face search index.
+
+    Holds every case embedding as one row of a pre-normalized float32 matrix,
+    next to an array of the matching database ids, so a search is a single
+    matrix-vector product instead of a per-row Python loop.
+
+    Once trained, rows are also partitioned into inverted lists (IVF) around
+    k-means centroids, each kept as its own array of row numbers, and a search
+    only touches and scores the rows of the `nprobe` lists closest to the
+    query. Passing nprobe=0 always falls back to an exact scan.
+
+    With a compact `encoding` (float16 or per-vector-scaled int8) the matrix
+    holds quantized rows and scores are approximate; callers re-rank the best
+    candidates against the embeddings stored in the database (see db.find_matches).
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, initial_capacity: int = 1024, encoding: str = "float32"):
+        self.dim = dim
+        self.encoding = encoding
+        self._dtype = quantize(np.zeros((1, dim), dtype=np.float32), encoding)[0].dtype
+        self._vectors = np.empty((initial_capacity, dim), dtype=self._dtype)
+        self._scales = np.ones(initial_capacity, dtype=np.float32)
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._lists = np.full(initial_capacity, -1, dtype=np.int32)
+        # Inverted lists: the rows of list l are _members[l][:_member_counts[l]],
+        # and row r sits at _positions[r] within its list.
+        self._members: list[np.ndarray] = []
+        self._member_counts = np.zeros(0, dtype=np.int64)
+        self._positions = np.zeros(initial_capacity, dtype=np.int64)
+        self._row_of: dict[int, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.centroids: np.ndarray | None = None
+        self.trained_size = 0
+        self.default_nprobe = DEFAULT_NPROBE
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, person_id: int) -> bool:
+        return person_id in self._row_of
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size].copy()
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def is_compact(self) -> bool:
+        return self.encoding != "float32"
+
+    @property
+    def score_margin(self) -> float:
+        return SCORE_MARGIN[self.encoding]
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes used by the stored vectors (and int8 scales) of the current rows."""
+        n = self._size
+        scale_bytes = self._scales[:n].nbytes if self.encoding == "int8" else 0
+        return self._vectors[:n].nbytes + scale_bytes
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _grow(self, needed: int) -> None:
+        """Doubles the backing arrays so appends stay amortised O(1)."""
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        vectors = np.empty((capacity, self.dim), dtype=self._dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        lists = np.full(capacity, -1, dtype=np.int32)
+        lists[:self._size] = self._lists[:self._size]
+        positions = np.zeros(capacity, dtype=np.int64)
+        positions[:self._size] = self._positions[:self._size]
+        self._vectors, self._scales, self._ids, self._lists, self._positions = vectors, scales, ids, lists, positions
+
+    def _rebuild_lists(self) -> None:
+        """Regroups every row into its inverted list after the assignments changed wholesale."""
+        n, nlist = self._size, len(self.centroids)
+        lists = self._lists[:n]
+        order = np.argsort(lists, kind="stable")
+        counts = np.bincount(lists, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        self._members = [order[start:start + count].astype(np.int64) for start, count in zip(starts, counts)]
+        self._member_counts = counts.astype(np.int64)
+        self._positions[order] = np.arange(n) - np.repeat(starts, counts)
+
+    def _list_append(self, list_no: int, row: int) -> None:
+        count = self._member_counts[list_no]
+        members = self._members[list_no]
+        if count == len(members):
+            grown = np.empty(max(4, 2 * count), dtype=np.int64)
+            grown[:count] = members[:count]
+            self._members[list_no] = members = grown
+        members[count] = row
+        self._positions[row] = count
+        self._member_counts[list_no] = count + 1
+
+    def _list_remove(self, list_no: int, row: int) -> None:
+        """Drops a row from its list by moving the list's last entry into its place."""
+        members = self._members[list_no]
+        position, last = self._positions[row], self._member_counts[list_no] - 1
+        moved = members[last]
+        members[position] = moved
+        self._positions[moved] = position
+        self._member_counts[list_no] = last
+
+    def _store(self, rows, vectors: np.ndarray) -> None:
+        """Writes normalized float vectors into the given rows in the index encoding."""
+        codes, scales = quantize(vectors, self.encoding)
+        self._vectors[rows] = codes
+        self._scales[rows] = scales
+
+    def _score(self, rows, q: np.ndarray) -> np.ndarray:
+        """
+        Similarity of q with the given rows (a slice or an index array). q is
+        one vector of shape (dim,) or several as columns of shape (dim, m), in
+        which case the result has one column per query.
+        """
+        vectors = self._vectors[rows]
+        if not self.is_compact:
+            return vectors @ q
+        scores = np.empty((len(vectors),) + q.shape[1:], dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_CHUNK):
+            # Upcast a chunk at a time so a scan never materialises a full float32 copy
+            scores[start:start + SCORE_CHUNK] = vectors[start:start + SCORE_CHUNK].astype(np.float32) @ q
+        if self.encoding == "int8":
+            scales = self._scales[rows]
+            scores *= scales if scores.ndim == 1 else scales[:, None]
+        return scores
+
+    def _assign_rows(self, start: int, stop: int, chunk_size: int = 65536) -> np.ndarray:
+        """Returns the nearest centroid for each stored row in [start, stop)."""
+        assignments = np.empty(stop - start, dtype=np.int32)
+        for offset in range(start, stop, chunk_size):
+            end = min(offset + chunk_size, stop)
+            block = dequantize(self._vectors[offset:end], self._scales[offset:end])
+            assignments[offset - start:end - start] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def build(self, ids: List[int], embeddings: np.ndarray) -> None:
+        """Replaces the whole index contents, e.g. when loading from the database."""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            self._size = 0
+            self._row_of = {}
+            self._grow(len(ids))
+            self._store(slice(0, len(ids)), self._normalize(embeddings))
+            self._ids[:len(ids)] = ids
+            self._row_of = {int(pid): row for row, pid in enumerate(ids)}
+            self._size = len(ids)
+            if self.is_trained:
+                self._lists[:self._size] = self._assign_rows(0, self._size)
+                self._rebuild_lists()
+            self.loaded = True
+
+    def train(self, nlist: int | None = None, iterations: int = 10, seed: int = 0) -> None:
+        """
+        Builds the IVF partition with spherical k-means over a sample of the
+        current rows, then assigns every row to its nearest centroid.
+        """
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return
+            nlist = nlist or max(1, int(2 * np.sqrt(n)))
+            nlist = min(nlist, n)
+            rng = np.random.default_rng(seed)
+            sample_rows = rng.choice(n, size=min(n, nlist * 32), replace=False)
+            sample = dequantize(self._vectors[sample_rows], self._scales[sample_rows])
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                counts = np.bincount(labels, minlength=nlist)
+                order = np.argsort(labels, kind="stable")
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                sums = np.zeros_like(centroids)
+                present = counts > 0
+                sums[present] = np.add.reduceat(sample[order], starts[present], axis=0)
+                empty = counts == 0
+                if empty.any():
+                    # Re-seed empty clusters from random sample points
+                    sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = self._normalize(sums)
+            self.centroids = centroids
+            self._lists[:n] = self._assign_rows(0, n)
+            self._rebuild_lists()
+            self.trained_size = n
+
+    def needs_training(self) -> bool:
+        """True when the index is big enough for IVF and untrained, or has outgrown its partition."""
+        if self._size < MIN_TRAIN_SIZE:
+            return False
+        return not self.is_trained or self._size > 4 * self.trained_size
+
+    def add(self, person_id: int, embedding: np.ndarray) -> None:
+        """Adds (or replaces) a single embedding."""
+        vector = self._normalize(np.asarray(embedding, dtype=np.float32).reshape(self.dim))
+        with self._lock:
+            row = self._row_of.get(person_id)
+            if row is None:
+                self._grow(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._row_of[person_id] = row
+            elif self.is_trained:
+                self._list_remove(self._lists[row], row)
+            self._store(slice(row, row + 1), vector[None, :])
+            self._ids[row] = person_id
+            if self.is_trained:
+                self._lists[row] = int(np.argmax(self.centroids @ vector))
+                self._list_append(self._lists[row], row)
+
+    def remove(self, person_id: int) -> bool:
+        """Removes an embedding by moving the last row into its slot."""
+        with self._lock:
+            row = self._row_of.pop(person_id, None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if self.is_trained:
+                self._list_remove(self._lists[row], row)
+                if row != last:
+                    # The last row moves into the freed slot; its list entry follows it
+                    self._members[self._lists[last]][self._positions[last]] = row
+                    self._positions[row] = self._positions[last]
+            if row != last:
+                self._vectors[row] = self._vectors[last]
+                self._scales[row] = self._scales[last]
+                self._ids[row] = self._ids[last]
+                self._lists[row] = self._lists[last]
+                self._row_of[int(self._ids[row])] = row
+            self._size = last
+            return True
+
+    def _probe_rows(self, q: np.ndarray, nprobe: int | None) -> np.ndarray | None:
+        """Rows in the nprobe lists nearest to q, or None when the whole index must be scanned."""
+        if nprobe is None:
+            nprobe = self.default_nprobe
+        if self.is_trained and 0 < nprobe < len(self.centroids):
+            probes = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+            return np.concatenate([self._members[l][:self._member_counts[l]] for l in probes])
+        return None
+
+    def search(self, query: np.ndarray, threshold: float, nprobe: int | None = None, top_k: int | None = None) -> List[Tuple[int, float]]:
+        """
+        Returns (person_id, similarity) pairs at or above the threshold, best first,
+        keeping only the best `top_k` when given.
+
+        nprobe=None uses the index default; nprobe=0 forces an exact scan.
+        """
+        q = self._normalize(np.asarray(query, dtype=np.float32).reshape(self.dim))
+        with self._lock:
+            rows = self._probe_rows(q, nprobe)
+            if rows is not None:
+                scores = self._score(rows, q)
+                hits = np.flatnonzero(scores >= threshold)
+                hit_ids = self._ids[rows[hits]]
+            else:
+                scores = self._score(slice(0, self._size), q)
+                hits = np.flatnonzero(scores >= threshold)
+                hit_ids = self._ids[hits]
+            hit_scores = scores[hits]
+        return self._ranked(hit_ids, hit_scores, top_k)
+
+    def search_many(self, queries: np.ndarray, threshold: float, nprobe: int | None = None, top_k: int | None = None) -> List[List[Tuple[int, float]]]:
+        """
+        Runs search() for several queries at once, e.g. every face in a group
+        photo, scoring them all in a single matrix product. Returns one ranked
+        hit list per query, in query order.
+
+        With the IVF index, every query is scored against the union of the
+        lists probed for any of them, which can only add matches.
+        """
+        queries = self._normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        if len(queries) == 0:
+            return []
+        with self._lock:
+            probed = [self._probe_rows(q, nprobe) for q in queries]
+            if any(rows is None for rows in probed):
+                scores = self._score(slice(0, self._size), queries.T)
+                ids = self._ids[:self._size]
+            else:
+                rows = np.unique(np.concatenate(probed))
+                scores = self._score(rows, queries.T)
+                ids = self._ids[rows]
+            results = []
+            for column in scores.T:
+                hits = np.flatnonzero(column >= threshold)
+                results.append(self._ranked(ids[hits], column[hits], top_k))
+        return results
+
+    def search_iter(
+        self, query: np.ndarray, threshold: float, nprobe: int | None = None,
+        top_k: int | None = None, chunk_size: int = 16384,
+    ) -> Iterator[Tuple[List[Tuple[int, float]], List[Tuple[int, float]], int, int]]:
+        """
+        Same search as search(), scored chunk by chunk. After each chunk yields
+        (new_hits, ranked_so_far, rows_scanned, rows_total), where new_hits are
+        the chunk's hits that made it into the running top_k.
+
+        The lock is only held per chunk, so cases added or removed while a
+        scan is in progress may be missed by it.
+        """
+        q = self._normalize(np.asarray(query, dtype=np.float32).reshape(self.dim))
+        with self._lock:
+            rows = self._probe_rows(q, nprobe)
+            total = len(rows) if rows is not None else self._size
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, total, chunk_size):
+            with self._lock:
+                if rows is not None:
+                    chunk_rows = rows[start:start + chunk_size]
+                    chunk_rows = chunk_rows[chunk_rows < self._size]
+                    scores = self._score(chunk_rows, q)
+                    ids = self._ids[chunk_rows]
+                else:
+                    stop = min(start + chunk_size, self._size)
+                    scores = self._score(slice(start, stop), q)
+                    ids = self._ids[start:stop].copy()
+            keep = scores >= threshold
+            chunk_ids = set(ids[keep].tolist())
+            ranked = self._ranked(np.concatenate([best_ids, ids[keep]]), np.concatenate([best_scores, scores[keep]]), top_k)
+            best_ids = np.array([pid for pid, _ in ranked], dtype=np.int64)
+            best_scores = np.array([score for _, score in ranked], dtype=np.float32)
+            new_hits = [hit for hit in ranked if hit[0] in chunk_ids]
+            yield new_hits, ranked, min(start + chunk_size, total), total
+
+    @staticmethod
+    def _ranked(ids: np.ndarray, scores: np.ndarray, top_k: int | None) -> List[Tuple[int, float]]:
+        """Sorts hits best first; with top_k, partially selects the best k before sorting just those."""
+        if top_k is not None and len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            ids, scores = ids[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def save(self, path: str) -> None:
+        """Writes the index to disk atomically so a crash never leaves a torn file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            n = self._size
+            arrays = {
+                "vectors": self._vectors[:n],
+                "scales": self._scales[:n],
+                "encoding": np.array(self.encoding),
+                "ids": self._ids[:n],
+                "lists": self._lists[:n],
+                "trained_size": np.int64(self.trained_size),
+            }
+            if self.is_trained:
+                arrays["centroids"] = self.centroids
+            # Unique per writer: several API processes may save the same index at shutdown
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Loads an index written by save(). Returns False if the file is missing or unusable."""
+        if not os.path.exists(path):
+            return False  # First start: the caller builds the index from the table
+        try:
+            data = np.load(path)
+            vectors, ids, lists = data["vectors"], data["ids"], data["lists"]
+            scales = data["scales"] if "scales" in data.files else np.ones(len(ids), dtype=np.float32)
+            encoding = str(data["encoding"]) if "encoding" in data.files else "float32"
+            centroids = data["centroids"] if "centroids" in data.files else None
+            trained_size = int(data["trained_size"])
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Could not load search index from {path}: {e}")
+            return False
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            return False
+        if encoding != self.encoding:
+            print(f"Search index file uses {encoding} but {self.encoding} is configured; rebuilding.")
+            return False
+        with self._lock:
+            self._size = 0
+            self._grow(len(ids))
+            self._vectors[:len(ids)] = vectors
+            self._scales[:len(ids)] = scales
+            self._ids[:len(ids)] = ids
+            self._lists[:len(ids)] = lists
+            self._row_of = {int(pid): row for row, pid in enumerate(ids)}
+            self._size = len(ids)
+            self.centroids = centroids
+            self.trained_size = trained_size
+            if self.is_trained:
+                self._rebuild_lists()
+            self.loaded = True
+        return True
+
+
+# Index of active cases (the 'persons' table), shared by the whole process.
+person_index = EmbeddingIndex(encoding=INDEX_ENCODING)
+# Embeddings of the found-persons archive, used to auto-match new cases (see auto_matcher.py)
+found_index = EmbeddingIndex(encoding=INDEX_ENCODING)
@@ -0,0 +1,49 @@
+# backend/search_video.py
+import argparse
+import asyncio
+import json
+
+import inference
+import video_search
+
+def format_time(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"
+
+def main():
+    """A command-line script to search a local video file for registered missing persons."""
+    parser = argparse.ArgumentParser(description="Search video footage for missing persons.")
+    parser.add_argument("video", help="Path to a video file (anything OpenCV/FFmpeg can read)")
+    parser.add_argument("--fps", type=float, default=video_search.VIDEO_SAMPLE_FPS, help="Frames analysed per second of footage")
+    parser.add_argument("--strictness", type=float, default=0.4)
+    parser.add_argument("--top-k", type=int, default=5, help="Matches shown per tracked face")
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    args = parser.parse_args()
+
+    print(f"--- Searching {args.video} ---")
+    inference.start(workers=1)
+    try:
+        result = asyncio.run(inference.extract_video_tracks(args.video, args.fps, timeout=video_search.VIDEO_TIMEOUT))
+        result = video_search.attach_matches(result, args.strictness, top_k=args.top_k)
+    except ValueError as e:
+        print(f"❌ Search failed. Error: {e}")
+        return
+    finally:
+        inference.shutdown()
+
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+        return
+    speed = result["duration"] / result["processing_seconds"] if result["processing_seconds"] else 0
+    print(f"Analysed {result['frames_sampled']} frames of {format_time(result['duration'])} "
+          f"in {result['processing_seconds']}s ({speed:.1f}x real time); {result['faces_tracked']} faces tracked.")
+    if not result["tracks"]:
+        print("No matches found.")
+    for track in result["tracks"]:
+        spans = ", ".join(f"{format_time(start)}-{format_time(end)}" for start, end in track["appearances"])
+        print(f"\nTrack {track['track_id']} (on screen {spans}, clearest at {format_time(track['best_time'])}):")
+        for match in track["matches"]:
+            print(f"  {match['similarity']:.3f}  #{match['id']} {match['name']} ({match['age']}, {match['loc']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# backend/sqlite_backend.py
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+
+# --- SQLite Configuration ---
+# Single-file storage for installs without a MySQL server (DB_BACKEND=sqlite).
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "missing_person.db")
+# Seconds a writer waits for another writer's transaction before giving up.
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 10))
+
+Error = sqlite3.Error
+
+# Same tables and indexes as the MySQL script in README.md. AUTOINCREMENT keeps
+# ids from being reused, as with InnoDB: index files and found_persons keep them.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(255) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL DEFAULT 'user'
+);
+
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NULL,
+    age INT NULL,
+    gender VARCHAR(50) NULL,
+    loc TEXT NULL,
+    photo_path VARCHAR(255) NULL,
+    embedding BLOB NULL,
+    created_by INTEGER NULL REFERENCES users (id) ON DELETE SET NULL ON UPDATE CASCADE,
+    import_batch CHAR(32) NULL
+);
+CREATE INDEX IF NOT EXISTS fk_persons_users_idx ON persons (created_by);
+CREATE INDEX IF NOT EXISTS idx_persons_photo_path ON persons (photo_path);
+
+CREATE TABLE IF NOT EXISTS found_persons (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(255) NULL,
+    age INT NULL,
+    gender VARCHAR(50) NULL,
+    loc TEXT NULL,
+    photo_path VARCHAR(255) NULL,
+    embedding BLOB NULL,
+    created_by INTEGER NULL
+);
+CREATE INDEX IF NOT EXISTS idx_found_persons_photo_path ON found_persons (photo_path);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    message VARCHAR(255) NOT NULL,
+    is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications (user_id, is_read, created_at);
+
+CREATE TABLE IF NOT EXISTS stream_tickets (
+    ticket VARCHAR(64) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    expires_at BIGINT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stream_tickets_expires_at ON stream_tickets (expires_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id CHAR(32) PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    owner_id INTEGER NOT NULL,
+    job_key CHAR(64) NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    result TEXT NULL,
+    error TEXT NULL,
+    created_at DOUBLE NOT NULL,
+    updated_at DOUBLE NOT NULL,
+    available_at DOUBLE NOT NULL,
+    lease_until DOUBLE NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (kind, status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (job_key);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (status, updated_at);
+"""
+
+# TIMESTAMP columns come back as datetime, like they do from MySQL
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?\s*$", re.IGNORECASE)
+_schema_lock = threading.Lock()
+_schema_created: set = set()
+
+
+@lru_cache(maxsize=512)
+def _translate(sql: str) -> str:
+    """
+    Rewrites the MySQL dialect used in db.py for SQLite: %s placeholders become
+    ?, and FOR UPDATE [SKIP LOCKED] is dropped (start_transaction() already
+    takes the write lock).
+    """
+    return _FOR_UPDATE.sub("", sql.replace("%s", "?"))
+
+
+class Cursor:
+    """
+    A sqlite3 cursor with the parts of the mysql.connector cursor API that
+    db.py uses: %s placeholders, dictionary rows, and lastrowid after
+    executemany pointing at the first inserted row.
+    """
+
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self.lastrowid = None
+
+    def execute(self, sql: str, params=()) -> None:
+        self._cursor.execute(_translate(sql), tuple(params or ()))
+        self.lastrowid = self._cursor.lastrowid
+
+    def executemany(self, sql: str, seq_params) -> None:
+        self._cursor.executemany(_translate(sql), seq_params)
+        if sql.lstrip()[:6].upper() == "INSERT" and self._cursor.rowcount > 0:
+            # Rows inserted under one write lock get consecutive ids, as a
+            # multi-row INSERT does in InnoDB; report the first one like MySQL.
+            last_id = self._cursor.connection.execute("SELECT last_insert_rowid()").fetchone()[0]
+            self.lastrowid = last_id - self._cursor.rowcount + 1
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self) -> list:
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class Connection:
+    """
+    A sqlite3 connection that stands in for a mysql.connector connection, so
+    the queries in db.py and ConnectionPool work unchanged on either backend.
+    """
+
+    def __init__(self, cnx: sqlite3.Connection):
+        self._cnx = cnx
+
+    def cursor(self, dictionary: bool = False, prepared: bool = False) -> Cursor:
+        # sqlite3 keeps its own per-connection statement cache, so a "prepared"
+        # cursor is an ordinary one.
+        return Cursor(self._cnx.cursor(), dictionary)
+
+    def start_transaction(self) -> None:
+        # IMMEDIATE takes the write lock up front: what SELECT ... FOR UPDATE
+        # achieves in InnoDB, at database rather than row granularity.
+        self._cnx.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._cnx.in_transaction
+
+    def commit(self) -> None:
+        self._cnx.commit()
+
+    def rollback(self) -> None:
+        self._cnx.rollback()
+
+    def ping(self, reconnect: bool = False) -> None:
+        self._cnx.execute("SELECT 1").fetchone()
+
+    def close(self) -> None:
+        self._cnx.close()
+
+
+def create_schema(cnx: sqlite3.Connection) -> None:
+    cnx.executescript(SCHEMA)
+
+
+def connect(path: str = SQLITE_PATH) -> Connection:
+    """
+    Opens the database file in WAL mode, creating it and its tables on first
+    use. With WAL, readers never wait for the single writer and commits only
+    append to the log, which suits the API's many short reads.
+    """
+    cnx = sqlite3.connect(
+        path,
+        timeout=SQLITE_BUSY_TIMEOUT,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,  # ConnectionPool hands connections between threads, one at a time
+    )
+    cnx.execute("PRAGMA journal_mode = WAL")
+    cnx.execute("PRAGMA synchronous = NORMAL")  # Durable across app crashes; an OS crash may lose the last commits
+    cnx.execute("PRAGMA foreign_keys = ON")
+    with _schema_lock:
+        if path not in _schema_created:
+            create_schema(cnx)
+            _schema_created.add(path)
+    return Connection(cnx)
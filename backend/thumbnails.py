@@ -0,0 +1,78 @@
+# backend/thumbnails.py
+
+import os
+import uuid
+from io import BytesIO
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+import photo_store
+
+THUMBNAILS_DIR = "thumbnails"
+# Longest side of a thumbnail. Case cards are 256 px tall, so this stays sharp
+# on high-DPI screens while weighing a few tens of KB.
+THUMBNAIL_SIZE = int(os.environ.get("THUMBNAIL_SIZE", 512))
+# WebP for browsers (all current ones), JPEG as the fallback rendition.
+THUMBNAIL_FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpg": ("JPEG", {"quality": 82, "progressive": True})}
+
+
+def thumbnail_name(photo_path: str, extension: str) -> str:
+    """Thumbnail file name relative to THUMBNAILS_DIR, mirroring the photo's place under PHOTOS_DIR."""
+    return f"{os.path.splitext(photo_store.url_path(photo_path))[0]}.{extension}"
+
+
+def thumbnail_paths(photo_path: str) -> Dict[str, str]:
+    """Paths on disk of every rendition of a photo, keyed by extension."""
+    return {ext: os.path.join(THUMBNAILS_DIR, thumbnail_name(photo_path, ext)) for ext in THUMBNAIL_FORMATS}
+
+
+def generate(photo_path: str, image_bytes: bytes | None = None, overwrite: bool = False) -> Dict[str, str]:
+    """
+    Writes the renditions of one photo and returns their paths. Pass the
+    upload's bytes when they are at hand to skip re-reading the file.
+    """
+    paths = thumbnail_paths(photo_path)
+    if not overwrite and all(os.path.exists(path) for path in paths.values()):
+        return paths
+    if image_bytes is None:
+        with open(photo_path, "rb") as f:
+            image_bytes = f.read()
+    img = Image.open(BytesIO(image_bytes))
+    if img.format == "JPEG":
+        img.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+    for ext, path in paths.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image_format, options = THUMBNAIL_FORMATS[ext]
+        # Write under a unique temporary name so a half-written file is never served,
+        # even while another request or script renders the same photo
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            img.save(tmp_path, image_format, **options)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return paths
+
+
+def delete(photo_path: str) -> None:
+    """Removes a photo's renditions, e.g. when the photo itself is discarded."""
+    for path in thumbnail_paths(photo_path).values():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def generate_quietly(photo_path: str, image_bytes: bytes | None = None) -> bool:
+    """generate() for registration paths: a failed thumbnail must never fail the registration."""
+    try:
+        generate(photo_path, image_bytes)
+        return True
+    except Exception as e:
+        print(f"Thumbnail generation failed for {photo_path}: {e}")
+        return False
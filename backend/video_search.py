@@ -0,0 +1,207 @@
+# backend/video_search.py
+
+import os
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+# --- Video Search Configuration ---
+# Frames analysed per second of footage. People rarely cross the frame in under
+# half a second, so 2 fps finds nearly everyone at a fraction of the cost.
+VIDEO_SAMPLE_FPS = float(os.environ.get("VIDEO_SAMPLE_FPS", 2))
+# A detection continues a track when its box overlaps the track's last box by
+# this IoU and the track was seen at most TRACK_MAX_GAP seconds earlier.
+TRACK_IOU = float(os.environ.get("TRACK_IOU", 0.3))
+TRACK_MAX_GAP = float(os.environ.get("TRACK_MAX_GAP", 1.5))
+# Tracks whose best-face embeddings are at least this similar are merged,
+# e.g. someone who walks behind a pillar and reappears.
+TRACK_MERGE_SIMILARITY = float(os.environ.get("TRACK_MERGE_SIMILARITY", 0.6))
+# Faces narrower than this (in pixels, after downscaling) are too small to identify.
+MIN_FACE_SIZE = int(os.environ.get("MIN_FACE_SIZE", 20))
+# Upper bound for one video job in the inference pool.
+VIDEO_TIMEOUT = float(os.environ.get("VIDEO_TIMEOUT", 3600))
+
+EMBED_BATCH_SIZE = 32
+
+
+def sample_frames(path: str, sample_fps: float = VIDEO_SAMPLE_FPS, max_side: int | None = None) -> Iterator[tuple[float, np.ndarray, float]]:
+    """
+    Yields (timestamp_seconds, RGB frame, scale) at roughly `sample_fps`, where
+    frames are downscaled to max_side and scale maps their pixel coordinates
+    back to the original video. Frames in between are skipped with grab(),
+    which never converts them to images.
+    """
+    import cv2
+    import face_utils
+
+    max_side = max_side or face_utils.MAX_IMAGE_SIDE
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {os.path.basename(path)}")
+    try:
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, round(source_fps / sample_fps)) if sample_fps > 0 else 1
+        frame_index = 0
+        while capture.grab():
+            if frame_index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                height, width = frame.shape[:2]
+                scale = max_side / max(height, width)
+                if scale < 1:
+                    frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+                # Photos reach the models as RGB (see face_utils.load_image); feed frames the same way
+                yield frame_index / source_fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), max(height, width) / max(frame.shape[:2])
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def video_duration(path: str) -> float | None:
+    """Length of the clip in seconds from the container's frame count and rate, if it reports them."""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    finally:
+        capture.release()
+    return frame_count / fps if fps > 0 and frame_count > 0 else None
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+class _Track:
+    """One person's run of detections across sampled frames."""
+
+    def __init__(self, timestamp: float, bbox: np.ndarray, quality: float, crop: np.ndarray):
+        self.start = self.end = timestamp
+        self.bbox = bbox
+        self.detections = 1
+        self.best_time, self.best_bbox, self.best_quality, self.best_crop = timestamp, bbox, quality, crop
+
+    def extend(self, timestamp: float, bbox: np.ndarray, quality: float, crop: np.ndarray) -> None:
+        self.end, self.bbox = timestamp, bbox
+        self.detections += 1
+        if quality > self.best_quality:
+            self.best_time, self.best_bbox, self.best_quality, self.best_crop = timestamp, bbox, quality, crop
+
+
+def _update_tracks(tracks: List[_Track], timestamp: float, detections: list) -> None:
+    """Greedily attaches each detection to the overlapping live track, or starts a new track."""
+    live = [t for t in tracks if timestamp - t.end <= TRACK_MAX_GAP]
+    pairs = sorted(
+        ((_iou(t.bbox, bbox), ti, di) for ti, t in enumerate(live) for di, (bbox, _, _) in enumerate(detections)),
+        reverse=True,
+    )
+    used_tracks, used_detections = set(), set()
+    for iou, ti, di in pairs:
+        if iou < TRACK_IOU:
+            break
+        if ti in used_tracks or di in used_detections:
+            continue
+        live[ti].extend(timestamp, *detections[di])
+        used_tracks.add(ti)
+        used_detections.add(di)
+    for di, detection in enumerate(detections):
+        if di not in used_detections:
+            tracks.append(_Track(timestamp, *detection))
+
+
+def _merge_tracks(tracks: List[_Track], embeddings: np.ndarray) -> List[tuple[List[_Track], np.ndarray]]:
+    """Groups tracks of the same person; each group keeps the embedding of its best face."""
+    normed = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    groups: List[tuple[List[_Track], int]] = []  # (tracks, index of the best track's embedding)
+    for i in sorted(range(len(tracks)), key=lambda i: -tracks[i].best_quality):
+        for members, best in groups:
+            if normed[best] @ normed[i] >= TRACK_MERGE_SIMILARITY:
+                members.append(tracks[i])
+                break
+        else:
+            groups.append(([tracks[i]], i))
+    return [(members, embeddings[best]) for members, best in groups]
+
+
+def extract_tracks(path: str, sample_fps: float = VIDEO_SAMPLE_FPS) -> Dict[str, Any]:
+    """
+    Runs in an inference worker. Detects faces in the sampled frames, links
+    them into tracks and embeds only the best face of each track, so every
+    person on screen costs one recognition pass however long they stay.
+    """
+    import face_utils
+    from insightface.utils import face_align
+
+    app = face_utils.get_app()
+    rec_model = app.models["recognition"]
+    started = time.perf_counter()
+    tracks: List[_Track] = []
+    frames = 0
+    last_timestamp = 0.0
+    for timestamp, frame, scale in sample_frames(path, sample_fps):
+        frames += 1
+        last_timestamp = timestamp
+        bboxes, kpss = app.det_model.detect(frame, max_num=0, metric="default")
+        detections = []
+        for bbox, kps in zip(bboxes, kpss if kpss is not None else []):
+            box, score = bbox[:4], float(bbox[4])
+            size = min(box[2] - box[0], box[3] - box[1])
+            if size < MIN_FACE_SIZE:
+                continue
+            crop = face_align.norm_crop(frame, landmark=kps, image_size=rec_model.input_size[0])
+            # Large, confident detections make the best representative face for a track.
+            # Boxes are kept in original-video pixels, like face_utils.get_faces returns them.
+            detections.append((box * scale, score * size, crop))
+        _update_tracks(tracks, timestamp, detections)
+
+    people = []
+    if tracks:
+        crops = [t.best_crop for t in tracks]
+        embeddings = np.concatenate([
+            rec_model.get_feat(crops[start:start + EMBED_BATCH_SIZE])
+            for start in range(0, len(crops), EMBED_BATCH_SIZE)
+        ])
+        for members, embedding in _merge_tracks(tracks, embeddings):
+            best = max(members, key=lambda t: t.best_quality)
+            people.append({
+                "appearances": sorted([round(t.start, 2), round(t.end, 2)] for t in members),
+                "best_time": round(best.best_time, 2),
+                "bbox": [round(float(v), 1) for v in best.best_bbox],
+                "detections": sum(t.detections for t in members),
+                "embedding": embedding,
+            })
+    people.sort(key=lambda p: p["appearances"][0][0])
+    # The last sampled frame can be up to a sampling interval short of the end
+    duration = max(video_duration(path) or 0.0, last_timestamp)
+    return {
+        "tracks": people,
+        "frames_sampled": frames,
+        "duration": round(duration, 2),
+        "processing_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def attach_matches(result: Dict[str, Any], strictness: float, top_k: int | None = None, matched_only: bool = True) -> Dict[str, Any]:
+    """
+    Runs in the API process (where the case index lives): searches every
+    track's embedding in one batch and replaces embeddings with matches.
+    """
+    import db
+
+    tracks = result["tracks"]
+    matches = db.find_matches_many([t.pop("embedding") for t in tracks], strictness, top_k=top_k)
+    for track_id, (track, track_matches) in enumerate(zip(tracks, matches), start=1):
+        track["track_id"] = track_id
+        track["matches"] = track_matches
+    if matched_only:
+        result["tracks"] = [t for t in tracks if t["matches"]]
+    result["faces_tracked"] = len(tracks)
+    return result
@@ -1,12 +1,21 @@
 // src/components/CaseCard.jsx
-import React from 'react';
+import React, { useState } from 'react';
 
 const PLACEHOLDER_IMAGE = 'https://via.placeholder.com/400x400.png?text=No+Image';
 
 function CaseCard({ person, onMarkFound }) { // Added onMarkFound prop
+  // Show the small thumbnail; if it is missing (not generated yet), fall back to the full photo, then a placeholder
+  const [thumbnailFailed, setThumbnailFailed] = useState(false);
   if (!person) return null;
 
-  const handleImageError = (e) => { e.target.src = PLACEHOLDER_IMAGE; };
+  const showThumbnail = person.thumbnail_url && !thumbnailFailed;
+  const handleImageError = (e) => {
+    if (showThumbnail) {
+      setThumbnailFailed(true);
+    } else {
+      e.target.src = PLACEHOLDER_IMAGE;
+    }
+  };
 
   const handleMarkFoundClick = (e) => {
     e.stopPropagation(); // Prevents any parent click events
@@ -17,7 +26,16 @@ function CaseCard({ person, onMarkFound }) { // Added onMarkFound prop
 
   return (
     <div className="bg-gray-800 rounded-lg shadow-lg overflow-hidden transition hover:shadow-blue-500/50 hover:-translate-y-1 flex flex-col">
-      <img src={person.photo_url || PLACEHOLDER_IMAGE} alt={person.name || 'Unknown'} className="w-full h-64 object-cover" onError={handleImageError} />
+      <picture>
+        {showThumbnail && <source srcSet={person.thumbnail_url} type="image/webp" />}
+        <img
+          src={(showThumbnail ? person.thumbnail_jpeg_url : person.photo_url) || person.photo_url || PLACEHOLDER_IMAGE}
+          alt={person.name || 'Unknown'}
+          loading="lazy"
+          className="w-full h-64 object-cover"
+          onError={handleImageError}
+        />
+      </picture>
       <div className="p-4 flex-grow flex flex-col">
         <h3 className="text-xl font-bold text-white">{person.name || 'No Name'}</h3>
         <p className="text-gray-400">{person.age ? `${person.age} years old` : 'Unknown Age'} — {person.gender || 'Unknown Gender'}</p>
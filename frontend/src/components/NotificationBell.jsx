@@ -1,56 +1,73 @@
 // src/components/NotificationBell.jsx
 
 import React, { useState, useEffect } from 'react';
-import { getNotifications, markNotificationAsRead } from '../services/api';
+import { getNotifications, markNotificationAsRead, markNotificationsAsRead, openNotificationStream } from '../services/api';
+
+const PAGE_SIZE = 20;
 
 function NotificationBell() {
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
   const [isOpen, setIsOpen] = useState(false);
+  const [hasLoaded, setHasLoaded] = useState(false);
   const [error, setError] = useState('');
 
-  // Function to fetch notifications from the API
+  // The unread count and new notifications are pushed by the server, so the
+  // list itself is only fetched (one page) the first time the dropdown opens.
+  useEffect(() => {
+    const source = openNotificationStream((event) => {
+      if (event.event === 'unread_count') {
+        setUnreadCount(event.count);
+      } else if (event.event === 'notification') {
+        setUnreadCount(count => count + 1);
+        setNotifications(prev => [event.notification, ...prev.filter(n => n.id !== event.notification.id)]);
+      }
+    });
+    return () => source.close(); // Close the stream when the component is removed
+  }, []);
+
   const fetchNotifications = async () => {
     try {
-      const data = await getNotifications();
-      // For debugging: see what the API returns
-      console.log("Fetched notifications:", data); 
-      // Safely set the notifications, defaulting to an empty array
+      const data = await getNotifications({ limit: PAGE_SIZE });
       setNotifications(data.notifications || []);
+      setHasLoaded(true);
+      setError('');
     } catch (error) {
       console.error('Could not fetch notifications:', error);
       setError('Could not load notifications.');
     }
   };
 
-  // Fetch notifications only when the component first mounts (loads)
-  useEffect(() => {
-    fetchNotifications();
-  }, []); // The empty array [] means this effect runs only once
-
-  // Calculate the number of unread notifications
-  const unreadCount = notifications.filter(n => !n.is_read).length;
-
   // Function to handle marking a single notification as read
   const handleMarkAsRead = async (notificationId) => {
     try {
       await markNotificationAsRead(notificationId);
-      // Update the state locally for instant UI feedback without a full re-fetch
-      setNotifications(prevNotifications => 
-        prevNotifications.map(n => 
+      // Update the state locally for instant UI feedback; the stream sends the new count too
+      setNotifications(prevNotifications =>
+        prevNotifications.map(n =>
           n.id === notificationId ? { ...n, is_read: true } : n
         )
       );
+      setUnreadCount(count => Math.max(count - 1, 0));
     } catch (error) {
       console.error('Failed to mark notification as read', error);
-      // Optionally, set an error message to show the user
     }
   };
-  
+
+  const handleMarkAllAsRead = async () => {
+    try {
+      await markNotificationsAsRead();
+      setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+      setUnreadCount(0);
+    } catch (error) {
+      console.error('Failed to mark notifications as read', error);
+    }
+  };
+
   // Handle clicking the bell icon
   const handleBellClick = () => {
-    // When opening the dropdown, it's a good idea to re-fetch the notifications
-    if (!isOpen) {
-        fetchNotifications();
+    if (!isOpen && !hasLoaded) {
+      fetchNotifications();
     }
     // Toggle the dropdown's visibility
     setIsOpen(!isOpen);
@@ -67,7 +84,7 @@ function NotificationBell() {
         {/* The Red Badge for unread notifications */}
         {unreadCount > 0 && (
           <span className="absolute top-0 right-0 flex h-4 w-4 items-center justify-center rounded-full bg-red-600 text-xs font-semibold text-white">
-            {unreadCount}
+            {unreadCount > 99 ? '99+' : unreadCount}
           </span>
         )}
       </button>
@@ -75,8 +92,13 @@ function NotificationBell() {
       {/* The Dropdown Menu */}
       {isOpen && (
         <div className="absolute right-0 mt-2 w-80 max-w-sm bg-gray-800 border border-gray-700 rounded-lg shadow-xl z-20">
-          <div className="p-3 font-bold border-b border-gray-700 text-white">
-            Notifications
+          <div className="p-3 font-bold border-b border-gray-700 text-white flex justify-between items-center">
+            <span>Notifications</span>
+            {unreadCount > 0 && (
+              <button onClick={handleMarkAllAsRead} className="text-xs text-blue-400 hover:underline font-semibold">
+                Mark all as read
+              </button>
+            )}
           </div>
           <ul className="max-h-96 overflow-y-auto">
             {error && <li className="p-3 text-center text-red-400">{error}</li>}
@@ -108,4 +130,4 @@ function NotificationBell() {
   );
 }
 
-export default NotificationBell;
\ No newline at end of file
+export default NotificationBell;
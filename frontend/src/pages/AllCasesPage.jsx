@@ -7,12 +7,15 @@ function AllCasesPage() {
   const [cases, setCases] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchCases = async () => {
       try {
         const response = await getAllActiveCases();
         setCases(response.cases || []);
+        setNextCursor(response.next_cursor ?? null);
       } catch (err) {
         setError('Failed to load cases. You may not have admin rights.');
       } finally {
@@ -22,6 +25,20 @@ function AllCasesPage() {
     fetchCases();
   }, []);
 
+  // Fetch the next page, continuing after the last case already shown
+  const loadMore = async () => {
+    setIsLoadingMore(true);
+    try {
+      const response = await getAllActiveCases({ cursor: nextCursor });
+      setCases(prev => [...prev, ...(response.cases || [])]);
+      setNextCursor(response.next_cursor ?? null);
+    } catch (err) {
+      setError('Failed to load more cases.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   if (isLoading) return <div className="text-center p-8">Loading All Active Cases...</div>;
   if (error) return <div className="text-center p-8 text-red-400">{error}</div>;
 
@@ -37,6 +54,17 @@ function AllCasesPage() {
           ))}
         </div>
       )}
+      {nextCursor && (
+        <div className="mt-8 text-center">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-6 bg-gray-700 text-white font-semibold rounded-lg hover:bg-gray-600 transition disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -7,6 +7,8 @@ function FoundCasesPage() {
   const [cases, setCases] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchCases = async () => {
@@ -14,6 +16,7 @@ function FoundCasesPage() {
         const response = await getFoundCases();
         if (response && response.cases) {
           setCases(response.cases);
+          setNextCursor(response.next_cursor ?? null);
         }
       } catch (err) {
         setError('Failed to load found cases.');
@@ -24,6 +27,20 @@ function FoundCasesPage() {
     fetchCases();
   }, []);
 
+  // Fetch the next page, continuing after the last case already shown
+  const loadMore = async () => {
+    setIsLoadingMore(true);
+    try {
+      const response = await getFoundCases({ cursor: nextCursor });
+      setCases(prev => [...prev, ...(response.cases || [])]);
+      setNextCursor(response.next_cursor ?? null);
+    } catch (err) {
+      setError('Failed to load more found cases.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   if (isLoading) return <div className="text-center p-8">Loading...</div>;
   if (error) return <div className="text-center p-8 text-red-400">{error}</div>;
 
@@ -40,6 +57,17 @@ function FoundCasesPage() {
           ))}
         </div>
       )}
+      {nextCursor && (
+        <div className="mt-8 text-center">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-6 bg-gray-700 text-white font-semibold rounded-lg hover:bg-gray-600 transition disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
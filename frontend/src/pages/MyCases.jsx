@@ -7,6 +7,8 @@ function MyCasesPage() {
   const [cases, setCases] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchCases = async () => {
@@ -14,6 +16,7 @@ function MyCasesPage() {
         const response = await getMyCases();
         if (response && response.cases) {
           setCases(response.cases);
+          setNextCursor(response.next_cursor ?? null);
         }
       } catch (err) {
         setError('Failed to load your cases. Please try again later.');
@@ -25,6 +28,20 @@ function MyCasesPage() {
     fetchCases();
   }, []); // The empty array [] means this effect runs once when the component mounts
 
+  // Fetch the next page, continuing after the last case already shown
+  const loadMore = async () => {
+    setIsLoadingMore(true);
+    try {
+      const response = await getMyCases({ cursor: nextCursor });
+      setCases(prev => [...prev, ...(response.cases || [])]);
+      setNextCursor(response.next_cursor ?? null);
+    } catch (err) {
+      setError('Failed to load more cases.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   if (isLoading) {
     return <div className="text-center p-8">Loading your cases...</div>;
   }
@@ -45,6 +62,17 @@ function MyCasesPage() {
           ))}
         </div>
       )}
+      {nextCursor && (
+        <div className="mt-8 text-center">
+          <button
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-6 bg-gray-700 text-white font-semibold rounded-lg hover:bg-gray-600 transition disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,7 +1,7 @@
 // src/pages/RegisterPersonPage.jsx
 
 import React, { useState } from 'react';
-import { registerPerson } from '../services/api';
+import { registerPerson, waitForJob } from '../services/api';
 
 function RegisterPersonPage() {
   const [formData, setFormData] = useState({
@@ -13,6 +13,7 @@ function RegisterPersonPage() {
   const [file, setFile] = useState(null);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
+  const [duplicates, setDuplicates] = useState([]); // Existing cases that look like the same person
   const [isLoading, setIsLoading] = useState(false);
 
   const handleChange = (e) => {
@@ -32,6 +33,7 @@ function RegisterPersonPage() {
     setIsLoading(true);
     setError('');
     setSuccess('');
+    setDuplicates([]);
 
     // We use FormData because we are sending a file
     const data = new FormData();
@@ -43,14 +45,21 @@ function RegisterPersonPage() {
     // Add other fields to FormData if you have them in your backend
 
     try {
+      // The server accepts the upload right away and finishes the registration in the background
       const response = await registerPerson(data);
-      setSuccess(response.message || 'Case registered successfully!');
+      const job = await waitForJob(response.data.job_id);
+      if (job.status === 'failed') {
+        setError(job.error || 'Failed to register case.');
+        return;
+      }
+      setSuccess('Case registered successfully!');
+      setDuplicates(job.result?.possible_duplicates || []);
       // Clear the form on success
       setFormData({ name: '', age: '', gender: 'Other', loc: '' });
       setFile(null);
       e.target.reset(); // Resets the file input
     } catch (err) {
-      setError(err.response?.data?.detail || 'Failed to register case.');
+      setError(err.response?.data?.detail || err.message || 'Failed to register case.');
     } finally {
       setIsLoading(false);
     }
@@ -100,6 +109,12 @@ function RegisterPersonPage() {
         {/* Status Messages */}
         {error && <p className="text-center text-red-400 mt-4">{error}</p>}
         {success && <p className="text-center text-green-400 mt-4">{success}</p>}
+        {duplicates.length > 0 && (
+          <p className="text-center text-yellow-300 mt-2">
+            This person may already be registered: similar to case {duplicates.map(d => `#${d.id} (${Math.round(d.similarity * 100)}%)`).join(', ')}.
+            An administrator will review possible duplicates.
+          </p>
+        )}
       </form>
     </div>
   );
@@ -1,7 +1,7 @@
 // src/pages/SearchPage.jsx
 
 import React, { useState, useEffect } from 'react';
-import { searchByPhoto, markAsFound } from '../services/api';
+import { searchByPhotoStream, searchFacesByPhoto, markAsFound } from '../services/api';
 import CaseCard from '../components/CaseCard';
 
 function SearchPage() {
@@ -9,9 +9,11 @@ function SearchPage() {
   const [file, setFile] = useState(null);
   const [preview, setPreview] = useState(null);
   const [strictness, setStrictness] = useState(0.4);
+  const [allFaces, setAllFaces] = useState(false);
 
   // State for managing the UI and results
   const [results, setResults] = useState([]);
+  const [faceResults, setFaceResults] = useState([]); // One entry per detected face in "all faces" mode
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
   const [message, setMessage] = useState('');
@@ -53,17 +55,35 @@ function SearchPage() {
     setError('');
     setMessage('');
     setResults([]);
+    setFaceResults([]);
 
     const formData = new FormData();
     formData.append('photo', file);
     formData.append('strictness', strictness);
 
     try {
-      const response = await searchByPhoto(formData);
-      setResults(response.matches || []); // Use || [] as a fallback for safety
-      if (!response.matches || response.matches.length === 0) {
-        setMessage('No matches found. Try lowering the strictness level.');
+      if (allFaces) {
+        const data = await searchFacesByPhoto(formData);
+        setFaceResults(data.faces || []);
+        if (!data.faces?.some(face => face.matches.length > 0)) {
+          setMessage('No matches found for any face. Try lowering the strictness level.');
+        }
+        return;
       }
+      // Results arrive progressively: show likely matches as soon as they are scored,
+      // then replace them with the final ranking when the search completes.
+      await searchByPhotoStream(formData, (event) => {
+        if (event.event === 'candidates') {
+          setResults(prev => [...prev, ...event.matches].sort((a, b) => b.similarity - a.similarity));
+        } else if (event.event === 'done') {
+          setResults(event.matches || []);
+          if (!event.matches || event.matches.length === 0) {
+            setMessage('No matches found. Try lowering the strictness level.');
+          }
+        } else if (event.event === 'error') {
+          setError(event.detail || 'An error occurred during the search.');
+        }
+      });
     } catch (err) {
       setError(err.response?.data?.detail || 'An error occurred during the search.');
     } finally {
@@ -81,6 +101,7 @@ function SearchPage() {
       await markAsFound(personId);
       // Remove the found person from the current search results for immediate UI feedback
       setResults(prevResults => prevResults.filter(p => p.id !== personId));
+      setFaceResults(prevFaces => prevFaces.map(face => ({ ...face, matches: face.matches.filter(p => p.id !== personId) })));
       setMessage('Case successfully moved to "Found Cases"!');
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to update case status.');
@@ -120,6 +141,15 @@ function SearchPage() {
               onChange={(e) => setStrictness(parseFloat(e.target.value))} 
               className="w-full h-2 bg-gray-700 rounded-lg appearance-none cursor-pointer" 
             />
+            <label className="flex items-center mt-4 text-sm text-gray-300">
+              <input
+                type="checkbox"
+                checked={allFaces}
+                onChange={(e) => setAllFaces(e.target.checked)}
+                className="mr-2"
+              />
+              Search every face in the photo (group or crowd photos)
+            </label>
           </div>
         </div>
         <button 
@@ -147,6 +177,25 @@ function SearchPage() {
             />
           ))}
         </div>
+
+        {/* Group photo results, one section per detected face */}
+        {faceResults.map((face, i) => (
+          <div key={i} className="mb-8">
+            <h2 className="text-xl font-bold mb-1">Face {i + 1}: {face.matches.length} Potential Match(es)</h2>
+            <p className="text-sm text-gray-400 mb-4">
+              Position in photo: ({Math.round(face.bbox[0])}, {Math.round(face.bbox[1])}) to ({Math.round(face.bbox[2])}, {Math.round(face.bbox[3])})
+            </p>
+            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+              {face.matches.map((person) => (
+                <CaseCard
+                  key={person.id}
+                  person={person}
+                  onMarkFound={handleMarkCaseAsFound}
+                />
+              ))}
+            </div>
+          </div>
+        ))}
       </div>
     </div>
   );
@@ -57,6 +57,22 @@ export const registerPerson = async (formData) => {
   });
 };
 
+// Registration is processed in the background; poll its job until it finishes.
+export const getJobStatus = async (jobId) => {
+  const response = await apiClient.get(`/api/jobs/${jobId}`);
+  return response.data;
+};
+
+export const waitForJob = async (jobId, { interval = 1000, timeout = 120000 } = {}) => {
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    const job = await getJobStatus(jobId);
+    if (job.status === 'succeeded' || job.status === 'failed') return job;
+    await new Promise(resolve => setTimeout(resolve, interval));
+  }
+  throw new Error('Registration is taking longer than expected. Check My Cases later.');
+};
+
 export const searchByPhoto = async (formData) => {
   try {
     const response = await apiClient.post('/api/person/search', formData, {
@@ -87,10 +103,49 @@ export const searchByPhoto = async (formData) => {
   }
 };
 
-export const getMyCases = async () => {
+// Searches with every face found in a group photo. Returns { faces: [{ bbox, det_score, matches }] }.
+export const searchFacesByPhoto = async (formData) => {
+  const response = await apiClient.post('/api/person/search/faces', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  });
+  return response.data;
+};
+
+// Streaming search: the server sends one JSON object per line as chunks of the
+// case index are scored. onEvent is called with each parsed line
+// ({ event: 'candidates' | 'done' | 'error', matches, ... }).
+export const searchByPhotoStream = async (formData, onEvent) => {
+  const token = localStorage.getItem('accessToken');
+  const response = await fetch(`${API_URL}/api/person/search/stream`, {
+    method: 'POST',
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+    body: formData,
+  });
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}));
+    // Shaped like an axios error so pages can read err.response.data.detail either way
+    throw { response: { status: response.status, data: body } };
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop(); // Keep any partial line for the next read
+    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+};
+
+// Listing endpoints are paginated: pass { cursor: nextCursor } from the previous page to get the next one.
+export const getMyCases = async (params = {}) => {
   try {
-    const response = await apiClient.get('/api/person/my-cases');
-    return response.data; // Should return { cases: [...] }
+    const response = await apiClient.get('/api/person/my-cases', { params });
+    return response.data; // Should return { cases: [...], next_cursor }
   } catch (error) {
     console.error("Error fetching user cases:", error);
     throw error;
@@ -103,23 +158,73 @@ export const markAsFound = async (personId) => {
   return await apiClient.post(`/api/person/${personId}/mark-found`);
 };
 
-export const getFoundCases = async () => {
-  const response = await apiClient.get('/api/person/found-cases');
-  return response.data; // Should return { cases: [...] }
+// Marks several cases as found at once; returns { found: [...ids], not_found: [...ids] }
+export const markManyAsFound = async (personIds) => {
+  const response = await apiClient.post('/api/person/mark-found', { ids: personIds });
+  return response.data;
+};
+
+export const getFoundCases = async (params = {}) => {
+  const response = await apiClient.get('/api/person/found-cases', { params });
+  return response.data; // Should return { cases: [...], next_cursor }
 };
 
 // Add this inside frontend/src/services/api.jsx
 
-export const getAllActiveCases = async () => {
-  const response = await apiClient.get('/api/person/all-active-cases');
-  return response.data; // Should return { cases: [...] }
+export const getAllActiveCases = async (params = {}) => {
+  const response = await apiClient.get('/api/person/all-active-cases', { params });
+  return response.data; // Should return { cases: [...], next_cursor }
 };
 
-export const getNotifications = async () => {
-  const response = await apiClient.get('/api/notifications');
+export const getNotifications = async (params = {}) => {
+  const response = await apiClient.get('/api/notifications', { params });
   return response.data;
 };
 
 export const markNotificationAsRead = async (notificationId) => {
   return await apiClient.post(`/api/notifications/${notificationId}/read`);
-};
\ No newline at end of file
+};
+// Marks several notifications as read in one request; omit ids to mark all of them.
+export const markNotificationsAsRead = async (ids = null) => {
+  return await apiClient.post('/api/notifications/read', { ids });
+};
+
+// Opens the Server-Sent Events stream of the user's notifications. onEvent receives
+// { event: 'unread_count', count } and { event: 'notification', notification }.
+// Each connection is opened with a fresh single-use ticket, so instead of letting
+// EventSource retry the same URL this reconnects itself; call .close() on the result to stop.
+const STREAM_RETRY_MS = 5000;
+
+export const openNotificationStream = (onEvent) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const reconnectLater = () => {
+    if (!closed) retryTimer = setTimeout(connect, STREAM_RETRY_MS);
+  };
+
+  const connect = async () => {
+    try {
+      const response = await apiClient.post('/api/notifications/stream-ticket');
+      if (closed) return;
+      source = new EventSource(`${API_URL}/api/notifications/stream?ticket=${encodeURIComponent(response.data.ticket)}`);
+      source.onmessage = (message) => onEvent(JSON.parse(message.data));
+      source.onerror = () => {
+        source.close();
+        reconnectLater();
+      };
+    } catch (error) {
+      reconnectLater();
+    }
+  };
+
+  connect();
+  return {
+    close: () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    },
+  };
+};